@@ -17,10 +17,6 @@ def valid_date(val):
     return is_valid_date(val, "%d-%b-%Y")
 
 
-def valid_number(val):
-    return isinstance(val, int) or isinstance(val, float) or isinstance(parse_str_to_float(val), float)
-
-
 def clean_columns(df):
     """
         Cleans the column names of the given DataFrame by renaming specific columns.
@@ -47,17 +43,21 @@ def clean_columns(df):
 def clean(df):
     df = remove_empty_rows(df)
     df = remove_empty_columns(df)
+    amount_columns = ["Withdrawal\nINR", "Deposit\nINR", "ClosingBalance\nINR"]
+    # Parse the amount columns at once, a row without a closing balance is not a transaction
+    amounts = {column: parse_amounts(df[column])["amount"] for column in amount_columns}
+    valid_balance = amounts["ClosingBalance\nINR"].notna()
     indices_to_drop = []
     for index, row in df.iterrows():
         if is_na_or_empty(row["Date"]) or is_na_or_empty(row["Narration"]) or is_na_or_empty(row["Reference No. / Cheque No."]):
             indices_to_drop.append(index)
             continue
-        if not valid_date(row["Date"]) or not valid_number(row["ClosingBalance\nINR"]):
+        if not valid_date(row["Date"]) or not valid_balance.at[index]:
             indices_to_drop.append(index)
             continue
-        row["ClosingBalance\nINR"] = parse_str_to_float(row["ClosingBalance\nINR"])
-        row["Withdrawal\nINR"] = parse_str_to_float(row["Withdrawal\nINR"])
-        row["Deposit\nINR"] = parse_str_to_float(row["Deposit\nINR"])
+    for column in amount_columns:
+        # An empty withdrawal or deposit cell means 0
+        df[column] = amounts[column].fillna(0.0)
     if indices_to_drop:
         df.drop(indices_to_drop, inplace=True)
     df = equitas_fix_date_format_df(df)
@@ -69,11 +69,12 @@ def equitas_bank_account_adapter(file_name, output):
     columns = ["Date", "Reference No. / Cheque No.", "Narration", "Withdrawal\nINR", "Deposit\nINR", "ClosingBalance\nINR"]
     df = pd.read_csv(file_name)
     df = clean(df)
+    categories = categorize_series(df[columns[2]])
     result = []
     for index, row in df.iterrows():
         txn_amount = row["Withdrawal"] if row["Withdrawal"] > 0 \
             else row["Deposit"] * -1
-        category, tags, notes = auto_detect_category(row[columns[2]])
+        category, tags, notes = categories.loc[index]
         if category:
             result.append(
                 {
@@ -13,18 +13,16 @@ def hdfc_fix_date_format_df(df):
 def is_na_or_empty(val):
     return pd.isna(val) or val is None or val == ''
 
-def valid_number(val):
-    return isinstance(val, int) or isinstance(val, float) or isinstance(parse_str_to_float(val), float)
-
-
 def clean(df):
+    # A row needs a number in the withdrawal or the deposit column
+    valid_amount = parse_amounts(df["Withdrawal Amt."])["amount"].notna() | parse_amounts(df["Deposit Amt."])["amount"].notna()
     indices_to_drop = []
     for index, row in df.iterrows():
         if (is_na_or_empty(row["Date"]) or is_na_or_empty(row["Chq./Ref.No."]) or (is_na_or_empty(row["Withdrawal Amt."])
                 and is_na_or_empty("Deposit Amt."))):
             indices_to_drop.append(index)
             continue
-        if not is_valid_date(row["Date"], "%d/%m/%y") or (not valid_number(row["Withdrawal Amt."]) and not valid_number(row["Deposit Amt."])):
+        if not is_valid_date(row["Date"], "%d/%m/%y") or not valid_amount.at[index]:
             indices_to_drop.append(index)
             continue
     if indices_to_drop:
@@ -45,9 +43,10 @@ def hdfc_bank_account_adapter(file_name, output):
     ]
     df = pd.read_excel(file_name, names=columns)
     df = clean(df)
+    categories = categorize_series(df[columns[1]])
     result = []
     for index, row in df.iterrows():
-        category, tags, notes = auto_detect_category(row[columns[1]])
+        category, tags, notes = categories.loc[index]
         txn_amount = -1
         if row[columns[4]] != "" and not math.isnan(row[columns[4]]):
             txn_amount = row[columns[4]]
@@ -18,20 +18,17 @@ def is_na_or_empty(val):
 def valid_date(val):
     return is_valid_date(val, "%d-%m-%Y %H:%M:%S")
 
-def valid_number(val):
-    return isinstance(val, int) or isinstance(val, float) or isinstance(parse_str_to_float(val), float)
-
-
 def clean(df):
+    # Parse the amount column at once, rows without a number are dropped below
+    df["Amount"] = parse_amounts(df["Amount"])["amount"]
     indices_to_drop = []
     for index, row in df.iterrows():
         if is_na_or_empty(row["Transaction Date"]) or is_na_or_empty(row["Description"]):
             indices_to_drop.append(index)
             continue
-        if not valid_date(row["Transaction Date"]) or not valid_number(row["Amount"]):
+        if not valid_date(row["Transaction Date"]) or pd.isna(row["Amount"]):
             indices_to_drop.append(index)
             continue
-        row["Amount"] = parse_str_to_float(row["Amount"])
     if indices_to_drop:
         df.drop(indices_to_drop, inplace=True)
     df = kotak_fix_date_format_df(df)
@@ -64,11 +61,12 @@ def kotak_bank_account_adapter(file_name, output):
     columns = ["Sl. No.", "Transaction Date", "Value Date", "Description", "Chq / Ref No.", "Amount", "Dr / Cr", "Balance"]
     df.columns = columns
     df = clean(df)
+    categories = categorize_series(df[columns[3]])
     result = []
     for index, row in df.iterrows():
         txn_amount = row[columns[5]] if row[columns[6]].lower() == "dr" \
             else row[columns[5]] * -1
-        category, tags, notes = auto_detect_category(row[columns[3]])
+        category, tags, notes = categories.loc[index]
         if category:
             result.append(
                 {
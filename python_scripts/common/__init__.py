@@ -1,3 +1,29 @@
+import importlib as _importlib
+
 from .constants import *
-from .utils import *
-from .csv_utils import *
\ No newline at end of file
+
+# utils, csv_utils and parquet_utils pull in pandas and numpy, so they are imported on first use
+# instead of at package import. Importing just the constants (e.g. Account for the
+# converter CLI) stays cheap, while `from common import *` and `from common import x`
+# keep exporting everything these modules define.
+_LAZY_SUBMODULES = (".utils", ".csv_utils", ".parquet_utils")
+_loaded = False
+
+
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    for submodule in _LAZY_SUBMODULES:
+        module = _importlib.import_module(submodule, __name__)
+        globals().update({name: value for name, value in vars(module).items() if not name.startswith("_")})
+    _loaded = True
+
+
+def __getattr__(name):
+    _load()
+    if name == "__all__":
+        return [each for each in globals() if not each.startswith("_")]
+    if name in globals():
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,309 @@
+import csv
+import functools
+import hashlib
+import logging
+import os
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .category_cache import CATEGORY_CACHE_FILE, CategoryCache
+
+CATEGORY_MAPPING_FILE = "config/category_mapping.csv"
+
+# Characters that make a keyword a regular expression rather than a plain substring
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordIndex:
+    """
+    Aho-Corasick automaton over a list of literal keywords.
+
+    search() reports every occurrence of every keyword in one pass over the text,
+    so the cost of a lookup depends on the length of the text and the number of
+    hits rather than on the number of keywords.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._lengths = [len(keyword) for keyword in keywords]
+        for keyword_id, keyword in enumerate(keywords):
+            self._add(keyword_id, keyword)
+        self._build()
+
+    def _add(self, keyword_id: int, keyword: str):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(keyword_id)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def search(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yields (keyword_id, start, end) for every keyword occurrence in the text.
+        """
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for keyword_id in self._output[node]:
+                yield keyword_id, position + 1 - self._lengths[keyword_id], position + 1
+
+
+class CategoryMatcher:
+    """
+    Detects the category of a transaction description using the keyword rules
+    in category_mapping.csv.
+
+    Plain keywords are looked up through a KeywordIndex and the few keywords that
+    use regex syntax are kept as compiled patterns. Every lookup checks the mtime
+    of the mapping file and reloads the rules only when the file has changed.
+
+    When a CategoryCache is given, results are memoized on disk per normalized
+    description and rules file hash.
+    """
+
+    def __init__(self, mapping_file: str = CATEGORY_MAPPING_FILE, cache: Optional[CategoryCache] = None):
+        self.mapping_file = mapping_file
+        self.cache = cache
+        self._mtime: Optional[float] = None
+        self._rules_hash: Optional[str] = None
+        self._rules: List[Tuple[str, str, str, str]] = []
+        self._index: Optional[KeywordIndex] = None
+        self._index_rule_ids: List[int] = []
+        self._regex_rules: List[Tuple[int, re.Pattern, re.Pattern]] = []
+
+    def _load(self):
+        rules = []
+        literal_keywords = []
+        index_rule_ids = []
+        regex_rules = []
+        with open(self.mapping_file, "rb") as fp:
+            rules_hash = hashlib.sha256(fp.read()).hexdigest()
+        with open(self.mapping_file, "r") as fp:
+            reader = csv.DictReader(fp)
+            for row in reader:
+                keyword = row["keyword"]
+                if not keyword:
+                    continue
+                rule_id = len(rules)
+                rules.append((keyword, row["category"], row["tags"], row["notes"]))
+                if REGEX_METACHARACTERS.isdisjoint(keyword):
+                    literal_keywords.append(keyword.lower())
+                    index_rule_ids.append(rule_id)
+                else:
+                    regex_rules.append(
+                        (
+                            rule_id,
+                            re.compile(r"^.*(%s).*$" % keyword.lower()),
+                            re.compile(keyword.lower()),
+                        )
+                    )
+        self._rules = rules
+        self._index = KeywordIndex(literal_keywords)
+        self._index_rule_ids = index_rule_ids
+        self._regex_rules = regex_rules
+        if rules_hash != self._rules_hash:
+            self._rules_hash = rules_hash
+            if self.cache is not None:
+                self.cache.invalidate(rules_hash)
+
+    def refresh(self):
+        """
+        Reloads the rules if the mapping file was modified since the last load.
+        """
+        mtime = os.stat(self.mapping_file).st_mtime
+        if mtime != self._mtime:
+            self._load()
+            self._mtime = mtime
+
+    @staticmethod
+    def _searchable(lowered: str) -> Optional[str]:
+        # Rules have always been evaluated as re.match(r"^.*(keyword).*$") without
+        # DOTALL, which only matches single line descriptions (a trailing newline is
+        # allowed). Keep that behaviour for the keywords served by the index.
+        text = lowered[:-1] if lowered.endswith("\n") else lowered
+        if "\n" in text:
+            return None
+        return text
+
+    def _hits(self, description: str) -> Dict[int, Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Returns {rule_id: (matched_text, spans)} for every rule matching the description.
+        """
+        self.refresh()
+        lowered = description.lower()
+        hits = {}
+        text = self._searchable(lowered)
+        if text is not None:
+            for keyword_id, start, end in self._index.search(text):
+                rule_id = self._index_rule_ids[keyword_id]
+                if rule_id not in hits:
+                    hits[rule_id] = (text[start:end], [])
+                hits[rule_id][1].append((start, end))
+        for rule_id, pattern, keyword_pattern in self._regex_rules:
+            match = pattern.match(lowered)
+            if match is not None and match.group(1):
+                spans = [each.span() for each in keyword_pattern.finditer(lowered) if each.group()]
+                hits[rule_id] = (match.group(1), spans)
+        return hits
+
+    def explain(self, description: str) -> List[Dict]:
+        """
+        Returns every rule matching the description, in the order of the mapping file.
+
+        Each entry has the keyword, category, tags and notes of the rule along with the
+        (start, end) offsets of each occurrence of the keyword in the description.
+        """
+        hits = self._hits(description)
+        result = []
+        for rule_id in sorted(hits):
+            keyword, category, tags, notes = self._rules[rule_id]
+            result.append(
+                {
+                    "keyword": keyword,
+                    "category": category,
+                    "tags": tags,
+                    "notes": notes,
+                    "offsets": hits[rule_id][1],
+                }
+            )
+        return result
+
+    def match(self, description: str) -> List[Tuple[str, str, str, str]]:
+        """
+        Returns (keyword, category, tags, notes) for every rule matching the description,
+        in the order of the mapping file.
+        """
+        hits = self._hits(description)
+        result = []
+        for rule_id in sorted(hits):
+            keyword, category, tags, notes = self._rules[rule_id]
+            result.append(
+                (
+                    keyword,
+                    category,
+                    tags,
+                    f"{notes if notes else hits[rule_id][0]} \n\n source of truth = {description}",
+                )
+            )
+        return result
+
+    def detect(self, description: str) -> Tuple[str, str, str]:
+        """
+        Returns (category, tags, notes) for the description. When the matching rules
+        disagree on the category, the rule with the longest keyword wins.
+        """
+        if self.cache is None:
+            return self._detect(description)
+        self.refresh()
+        cached = self.cache.get(self._rules_hash, description)
+        if cached is not None:
+            return cached
+        result = self._detect(description)
+        self.cache.put(self._rules_hash, description, result)
+        return result
+
+    def _detect(self, description: str) -> Tuple[str, str, str]:
+        result = self.match(description)
+        if len(result) > 1 and not all(list(map(lambda x: x[1] == result[0][1], result))):
+            most_relevant = functools.reduce(
+                lambda acc, curr: acc if len(acc[0]) > len(curr[0]) else curr,
+                result,
+                ("", "", "", ""),
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "'%s' detected multiple categories most_relevant=%s matches=%s",
+                    description,
+                    most_relevant[0],
+                    self.explain(description),
+                )
+            return most_relevant[1], most_relevant[2], most_relevant[3]
+        if len(result) > 0:
+            return result[0][1], result[0][2], result[0][3]
+        return "Others", "", f"\n\n source of truth = {description}"
+
+    def detect_series(self, descriptions: pd.Series) -> pd.DataFrame:
+        """
+        Vectorized form of detect() for a whole statement column.
+
+        Each distinct description is classified once and the result is broadcast
+        back to every row carrying it.
+
+        Parameters:
+        descriptions (pd.Series): Transaction descriptions. Non string values are
+            converted with str(), the same way the adapters do before calling detect().
+
+        Returns:
+        pd.DataFrame: Columns category, tags and notes aligned to the index of descriptions.
+        """
+        self.refresh()
+        descriptions = descriptions.map(str)
+        codes, uniques = pd.factorize(descriptions)
+        detected = [self.detect(value) for value in uniques]
+        if self.cache is not None:
+            self.cache.flush()
+        result = pd.DataFrame(detected, columns=["category", "tags", "notes"])
+        result = result.iloc[codes].reset_index(drop=True)
+        result.index = descriptions.index
+        return result
+
+
+_category_matcher: Optional[CategoryMatcher] = None
+
+
+def get_category_matcher() -> CategoryMatcher:
+    """
+    Returns the process wide CategoryMatcher shared by all the adapters.
+
+    Results are cached in the SQLite file named by the CATEGORY_CACHE_FILE env
+    variable (cache/category_cache.sqlite3 by default); set it to an empty value
+    to disable the cache.
+    """
+    global _category_matcher
+    if _category_matcher is None:
+        cache_file = os.getenv("CATEGORY_CACHE_FILE", CATEGORY_CACHE_FILE)
+        _category_matcher = CategoryMatcher(cache=CategoryCache(cache_file) if cache_file else None)
+    return _category_matcher
+
+
+def categorize_series(descriptions: pd.Series) -> pd.DataFrame:
+    """
+    Labels a Series of descriptions with category, tags and notes using the shared
+    CategoryMatcher. Returns the same values as auto_detect_category for each row.
+    """
+    return get_category_matcher().detect_series(descriptions)
+
+
+def explain_category(description: str) -> List[Dict]:
+    """
+    Lists every category rule matching the description along with the offsets
+    of the matched keyword. Useful to debug conflicting rules.
+    """
+    return get_category_matcher().explain(description)
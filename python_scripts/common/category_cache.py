@@ -0,0 +1,183 @@
+import atexit
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+CATEGORY_CACHE_FILE = "cache/category_cache.sqlite3"
+CATEGORY_CACHE_MAX_ENTRIES = 50000
+# Buffered writes are committed once this many are pending or this many seconds passed
+CATEGORY_CACHE_FLUSH_EVERY = 500
+CATEGORY_CACHE_FLUSH_INTERVAL = 5.0
+
+SOURCE_OF_TRUTH = "\n\n source of truth = %s"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description: str) -> str:
+    """
+    Normalizes a description into the form the category rules are matched against.
+    Descriptions with the same normalized form always get the same category.
+    """
+    return description.lower()
+
+
+class CategoryCache:
+    """
+    On-disk LRU cache of category detection results stored in SQLite.
+
+    Entries are keyed by the normalized description and the hash of the rules file
+    they were computed with, so editing category_mapping.csv invalidates them. The
+    "source of truth" suffix of the notes is not stored; it is rebuilt from the
+    description being looked up.
+
+    The connection runs in autocommit mode and lookups never write. New entries and
+    last_used updates are buffered in memory and written in one short transaction
+    every flush_every writes or flush_interval seconds, and by flush(). The cache is
+    shared by the batch converter worker processes, where atexit hooks don't run,
+    so no write lock may be held between flushes.
+    """
+
+    def __init__(
+        self,
+        cache_file: str = CATEGORY_CACHE_FILE,
+        max_entries: int = CATEGORY_CACHE_MAX_ENTRIES,
+        flush_every: int = CATEGORY_CACHE_FLUSH_EVERY,
+        flush_interval: float = CATEGORY_CACHE_FLUSH_INTERVAL,
+    ):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        # (rules_hash, normalized description) -> (category, tags, notes, last_used)
+        self._pending_puts = {}
+        # (rules_hash, normalized description) -> last_used
+        self._pending_touches = {}
+        self._last_flush = time.monotonic()
+        directory = os.path.dirname(cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(cache_file, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS category_cache (
+                rules_hash TEXT NOT NULL,
+                description TEXT NOT NULL,
+                category TEXT NOT NULL,
+                tags TEXT NOT NULL,
+                notes TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (rules_hash, description)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS category_cache_last_used ON category_cache (last_used)")
+        atexit.register(self.close)
+
+    def invalidate(self, rules_hash: str):
+        """
+        Drops every entry computed with a rules file other than rules_hash.
+        """
+        for pending in (self._pending_puts, self._pending_touches):
+            for key in [key for key in pending if key[0] != rules_hash]:
+                del pending[key]
+        self._conn.execute("DELETE FROM category_cache WHERE rules_hash != ?", (rules_hash,))
+
+    def get(self, rules_hash: str, description: str) -> Optional[Tuple[str, str, str]]:
+        key = (rules_hash, normalize_description(description))
+        pending = self._pending_puts.get(key)
+        if pending is not None:
+            row = pending[:3]
+        else:
+            row = self._conn.execute(
+                "SELECT category, tags, notes FROM category_cache WHERE rules_hash = ? AND description = ?", key
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if pending is None:
+            self._pending_touches[key] = time.time()
+            self._maybe_flush()
+        category, tags, notes = row
+        return category, tags, notes + SOURCE_OF_TRUTH % description
+
+    def put(self, rules_hash: str, description: str, result: Tuple[str, str, str]):
+        category, tags, notes = result
+        suffix = SOURCE_OF_TRUTH % description
+        if notes.endswith(suffix):
+            notes = notes[: -len(suffix)]
+        else:
+            # Notes that don't follow the usual layout can't be rebuilt for other descriptions
+            return
+        key = (rules_hash, normalize_description(description))
+        self._pending_puts[key] = (category, tags, notes, time.time())
+        self._pending_touches.pop(key, None)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        pending = len(self._pending_puts) + len(self._pending_touches)
+        if pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._write_pending()
+
+    def _write_pending(self) -> bool:
+        """
+        Writes the buffered entries and last_used updates in one transaction and evicts
+        the least recently used entries beyond max_entries. Returns False when there
+        was nothing to write.
+        """
+        self._last_flush = time.monotonic()
+        if not self._pending_puts and not self._pending_touches:
+            return False
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO category_cache VALUES (?, ?, ?, ?, ?, ?)",
+                [key + value for key, value in self._pending_puts.items()],
+            )
+            self._conn.executemany(
+                "UPDATE category_cache SET last_used = ? WHERE rules_hash = ? AND description = ?",
+                [(last_used,) + key for key, last_used in self._pending_touches.items()],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM category_cache WHERE rowid IN "
+                    "(SELECT rowid FROM category_cache ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending_puts.clear()
+        self._pending_touches.clear()
+        return True
+
+    def flush(self):
+        """
+        Writes the buffered entries and last_used updates and evicts the least
+        recently used entries beyond max_entries.
+        """
+        if self._write_pending():
+            logger.info("Category cache stats: %s", self.stats())
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
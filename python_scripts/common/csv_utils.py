@@ -7,6 +7,8 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from .parquet_utils import is_parquet_file, write_result_parquet
+
 
 def convert_date_format(value, existing_format, new_format):
     try:
@@ -70,18 +72,64 @@ def fix_date_format_df(
     pd.DataFrame: A DataFrame with the updated date formats.
     """
 
-    def handle(val):
-        try:
-            return convert_date_format(val, input_date_format, output_date_format)
-        except Exception:
-            return val
-
-    # Apply the date conversion function to the specified column
-    df[date_column] = df[date_column].apply(handle)
+    df[date_column] = normalize_dates(df[date_column], [input_date_format], output_date_format)
 
     return df
 
 
+def normalize_dates(
+    series: pd.Series,
+    formats: list,
+    output_format: str = "%Y-%m-%d",
+) -> pd.Series:
+    """
+    Vectorized convert_date_format for a whole column.
+
+    Every distinct string is parsed once with pd.to_datetime, trying each of the input
+    formats in order and then output_format, so values already in the output format are
+    kept (and normalized) like convert_date_format does. datetime values are formatted
+    directly. Values that can't be parsed are left unchanged and reported.
+
+    Parameters:
+    series (pd.Series): The dates to normalize.
+    formats (list): Input formats to try, in order.
+    output_format (str): The desired output format for the dates.
+
+    Returns:
+    pd.Series: The normalized dates, aligned to the index of series.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime(output_format)
+
+    result = series.astype(object)
+    is_datetime = series.map(lambda value: isinstance(value, datetime.datetime))
+    if is_datetime.any():
+        result[is_datetime] = pd.to_datetime(series[is_datetime]).dt.strftime(output_format)
+
+    is_string = series.map(lambda value: isinstance(value, str))
+    uniques = pd.Series(pd.unique(series[is_string]), dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    for date_format in list(formats) + [output_format]:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(uniques[pending], format=date_format, errors="coerce")
+    is_parsed = parsed.notna()
+    lookup = dict(zip(uniques[is_parsed], parsed[is_parsed].dt.strftime(output_format)))
+    mapped = series[is_string].map(lookup)
+    result[is_string] = mapped.fillna(series[is_string])
+
+    is_failed = series.notna() & ~is_datetime
+    is_failed[is_string] = mapped.isna()
+    failed = series[is_failed]
+    if len(failed) > 0:
+        print(
+            "Could not parse %s value(s) of '%s' with formats=%s: %s"
+            % (len(failed), series.name, list(formats) + [output_format], failed.head(10).to_dict())
+        )
+    return result
+
+
 def rename_csv_columns(input_filename, column_mapping):
     """
     Maps columns in an existing CSV file to a new DataFrame based on the provided column mapping.
@@ -207,7 +255,8 @@ def has_headers(output):
 
 def write_result(out_filename, result, headers=None, append=False):
     """
-    Write result rows to a CSV file.
+    Write result rows to a CSV file, or to a Parquet file when out_filename
+    ends with .parquet (see write_result_parquet).
     
     Args:
         out_filename: Output file path
@@ -215,6 +264,10 @@ def write_result(out_filename, result, headers=None, append=False):
         headers: List of column headers (defaults to standard transaction columns)
         append: If True, append to existing file; if False, overwrite
     """
+    if is_parquet_file(out_filename):
+        write_result_parquet(out_filename, result, headers=headers, append=append)
+        return
+
     if headers is None:
         output_columns = [
             "txn_date",
@@ -245,4 +298,30 @@ def write_result(out_filename, result, headers=None, append=False):
 
 
 def write_result_df(out_filename, df):
+    if is_parquet_file(out_filename):
+        write_result_parquet(out_filename, df.to_dict("records"), headers=list(df.columns))
+        return
     df.to_csv(out_filename, index=False, header=True)
+
+
+def debug_artifacts_enabled():
+    """
+    Intermediate files (raw PDF tables, _modified.csv) are only written when the
+    DEBUG_ARTIFACTS env variable is set, e.g. by the converter's --debug-artifacts flag.
+    """
+    return os.getenv("DEBUG_ARTIFACTS", "").lower() in ("1", "true", "yes")
+
+
+def write_debug_artifact(base_filename, suffix, df):
+    """
+    Writes df to {base_filename without extension}{suffix}.csv when debug artifacts are enabled.
+
+    Returns:
+        str: Path of the file written, or None when debug artifacts are disabled.
+    """
+    if not debug_artifacts_enabled():
+        return None
+    temp_file_name, _ = os.path.splitext(base_filename)
+    artifact_file = "%s%s.csv" % (temp_file_name, suffix)
+    write_result_df(artifact_file, df)
+    return artifact_file
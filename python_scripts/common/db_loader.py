@@ -0,0 +1,95 @@
+import csv
+import io
+import os
+
+from .parquet_utils import TRANSACTION_COLUMNS, iter_result_rows
+
+STAGING_TABLE = "transactions_staging"
+
+CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        txn_date date,
+        account text,
+        txn_type text,
+        txn_amount float8,
+        category text,
+        tags text,
+        notes text
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING_SQL = f"COPY {STAGING_TABLE} ({', '.join(TRANSACTION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# tags and notes default to '' in public.transactions. NULLs would never match the
+# unique constraint, so they are coalesced to keep re-loads idempotent.
+INSERT_FROM_STAGING_SQL = f"""
+    INSERT INTO public.transactions (txn_date, account, txn_type, txn_amount, category, tags, notes)
+    SELECT
+        txn_date,
+        account::public.account_type,
+        txn_type::public.txn_enum_type,
+        txn_amount,
+        category::public.txn_category_type,
+        COALESCE(tags, ''),
+        COALESCE(notes, '')
+    FROM {STAGING_TABLE}
+    ON CONFLICT (txn_date, account, txn_type, txn_amount, category, tags, notes) DO NOTHING
+"""
+
+
+def get_db_connection():
+    import psycopg2
+
+    db_user = os.getenv("DB_USER")
+    db_password = os.getenv("DB_PASSWORD")
+    db_name = os.getenv("DB_NAME")
+    if not db_user or not db_password or not db_name:
+        raise ValueError("Invalid database details passed.")
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432"),
+        database=db_name,
+        user=db_user,
+        password=db_password,
+    )
+
+
+def copy_rows(cursor, rows):
+    """
+    Streams a batch of row tuples into the staging table with COPY FROM STDIN.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(COPY_STAGING_SQL, buffer)
+
+
+def load_transactions(conn, paths, batch_size=10000):
+    """
+    Loads converter output files (CSV or Parquet) into public.transactions.
+
+    Rows are streamed into a temporary staging table with COPY, batch_size rows at a
+    time, and then moved over with a single INSERT ... SELECT that skips the rows
+    already present. Everything runs in one transaction, so a failed load leaves
+    public.transactions untouched.
+
+    Parameters:
+    conn: psycopg2 connection.
+    paths (list): Output files with the txn_date, account, txn_type, txn_amount,
+        category, tags and notes columns.
+    batch_size (int): Number of rows sent per COPY.
+
+    Returns:
+    tuple: (staged, inserted) row counts. staged - inserted rows were already loaded.
+    """
+    staged = 0
+    with conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+            for path in paths:
+                for rows in iter_result_rows(path, batch_size=batch_size):
+                    copy_rows(cursor, rows)
+                    staged += len(rows)
+            cursor.execute(INSERT_FROM_STAGING_SQL)
+            inserted = cursor.rowcount
+    return staged, inserted
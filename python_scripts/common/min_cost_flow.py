@@ -0,0 +1,133 @@
+import heapq
+import time
+from typing import List, Optional, Tuple
+
+INF = float("inf")
+
+
+class MinCostFlow:
+    """
+    Min cost max flow over integer capacities and non negative integer costs, using
+    successive shortest paths with Dijkstra and node potentials.
+
+    Nodes are numbered 0 .. n - 1. add_edge returns an edge id whose flow can be read
+    back with flow(edge_id) after solve().
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        # Edges are stored as parallel lists, the reverse of edge e is e ^ 1
+        self._to: List[int] = []
+        self._cap: List[int] = []
+        self._cost: List[int] = []
+        self._adjacency: List[List[int]] = [[] for _ in range(n)]
+        self._original_cap: List[int] = []
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: int) -> int:
+        edge_id = len(self._to)
+        for node, other, cap, edge_cost in ((source, target, capacity, cost), (target, source, 0, -cost)):
+            self._adjacency[node].append(len(self._to))
+            self._to.append(other)
+            self._cap.append(cap)
+            self._cost.append(edge_cost)
+            self._original_cap.append(cap)
+        return edge_id
+
+    def flow(self, edge_id: int) -> int:
+        return self._original_cap[edge_id] - self._cap[edge_id]
+
+    def solve(self, source: int, sink: int, deadline: Optional[float] = None) -> Tuple[int, int, bool]:
+        """
+        Pushes as much flow as possible from source to sink at the lowest cost.
+
+        When deadline (a time.monotonic() value) passes, stops after the current
+        round of augmentations and leaves the flow found so far, which is a valid but possibly
+        not maximal flow.
+
+        Returns (flow, cost, completed).
+        """
+        potential = [0] * self.n
+        total_flow = 0
+        total_cost = 0
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return total_flow, total_cost, False
+            distance = [INF] * self.n
+            distance[source] = 0
+            heap = [(0, source)]
+            while heap:
+                node_distance, node = heapq.heappop(heap)
+                if node_distance > distance[node]:
+                    continue
+                for edge in self._adjacency[node]:
+                    if self._cap[edge] <= 0:
+                        continue
+                    target = self._to[edge]
+                    candidate = node_distance + self._cost[edge] + potential[node] - potential[target]
+                    if candidate < distance[target]:
+                        distance[target] = candidate
+                        heapq.heappush(heap, (candidate, target))
+            if distance[sink] == INF:
+                return total_flow, total_cost, True
+            # Capping at the sink distance keeps every reduced cost non negative
+            for node in range(self.n):
+                potential[node] += min(distance[node], distance[sink])
+            pushed, cost = self._augment_admissible(source, sink, potential)
+            total_flow += pushed
+            total_cost += cost
+
+    def _admissible(self, edge: int, node: int, potential: List[int]) -> bool:
+        return self._cap[edge] > 0 and self._cost[edge] + potential[node] - potential[self._to[edge]] == 0
+
+    def _augment_admissible(self, source: int, sink: int, potential: List[int]) -> Tuple[int, int]:
+        """
+        Blocking flows (as in Dinic) over the edges with zero reduced cost, i.e. every
+        shortest path found by the last Dijkstra run is saturated before running it again.
+        """
+        total_flow = 0
+        total_cost = 0
+        while True:
+            level = [-1] * self.n
+            level[source] = 0
+            queue = [source]
+            for node in queue:
+                for edge in self._adjacency[node]:
+                    target = self._to[edge]
+                    if level[target] < 0 and self._admissible(edge, node, potential):
+                        level[target] = level[node] + 1
+                        queue.append(target)
+            if level[sink] < 0:
+                return total_flow, total_cost
+
+            next_edge = [0] * self.n
+            path: List[int] = []
+            node = source
+            while True:
+                if node == sink:
+                    push = min(self._cap[edge] for edge in path)
+                    for edge in path:
+                        self._cap[edge] -= push
+                        self._cap[edge ^ 1] += push
+                        total_cost += push * self._cost[edge]
+                    total_flow += push
+                    path = []
+                    node = source
+                    continue
+                adjacency = self._adjacency[node]
+                while next_edge[node] < len(adjacency):
+                    edge = adjacency[next_edge[node]]
+                    target = self._to[edge]
+                    if level[target] == level[node] + 1 and self._admissible(edge, node, potential):
+                        break
+                    next_edge[node] += 1
+                if next_edge[node] < len(adjacency):
+                    path.append(adjacency[next_edge[node]])
+                    node = self._to[path[-1]]
+                    continue
+                # Dead end, retreat and skip the edge that led here
+                if node == source:
+                    break
+                level[node] = -1
+                edge = path.pop()
+                node = self._to[edge ^ 1]
+                next_edge[node] += 1
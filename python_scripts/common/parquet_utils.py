@@ -0,0 +1,154 @@
+import csv
+import datetime
+import logging
+import math
+import os
+
+import pandas as pd
+
+TRANSACTION_COLUMNS = [
+    "txn_date",
+    "account",
+    "txn_type",
+    "txn_amount",
+    "category",
+    "tags",
+    "notes",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet output needs pyarrow, install it with `pip install pyarrow`") from exc
+    return pyarrow
+
+
+def is_parquet_file(path):
+    return os.path.splitext(str(path))[1].lower() in (".parquet", ".pq")
+
+
+def transaction_schema(columns=None):
+    """
+    Returns the pyarrow schema for the given output columns. The canonical
+    transaction columns get typed fields, anything else is stored as a string.
+    """
+    pa = _pyarrow()
+    types = {
+        "txn_date": pa.date32(),
+        "txn_amount": pa.float64(),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns or TRANSACTION_COLUMNS])
+
+
+def _is_missing(value):
+    return value is None or value == "" or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT
+
+
+def _to_date(value):
+    """
+    Returns value as a date, None when it is missing or not an ISO date (logged).
+    """
+    if _is_missing(value):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        logger.warning("Writing unparseable txn_date %r as null", value)
+        return None
+
+
+def _to_float(value):
+    """
+    Returns value as a float, None when it is missing or not a number (logged).
+    """
+    if _is_missing(value):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        logger.warning("Writing unparseable txn_amount %r as null", value)
+        return None
+    return None if math.isnan(value) else value
+
+
+def write_result_parquet(out_filename, result, headers=None, append=False):
+    """
+    Writes result rows to a Parquet file with typed columns.
+
+    Parameters:
+    out_filename (str): Output file path.
+    result (list): Rows as dictionaries, the same rows write_result takes.
+    headers (list): Output columns, defaults to the canonical transaction columns.
+    append (bool): Keep the rows already in out_filename. Parquet files can't be
+        appended to in place, so the existing rows are read back and rewritten.
+    """
+    pa = _pyarrow()
+    schema = transaction_schema(headers)
+    converters = {"txn_date": _to_date, "txn_amount": _to_float}
+    columns = {}
+    for field in schema:
+        convert = converters.get(field.name, lambda value: None if value is None else str(value))
+        columns[field.name] = pa.array([convert(row.get(field.name)) for row in result], type=field.type)
+    table = pa.table(columns, schema=schema)
+    if append and os.path.exists(out_filename):
+        table = pa.concat_tables([pa.parquet.read_table(out_filename, schema=schema), table])
+    pa.parquet.write_table(table, out_filename)
+
+
+def read_result(path, columns=None):
+    """
+    Loads a converter output file into a DataFrame.
+
+    Parquet files keep their column types (txn_date as dates, txn_amount as float)
+    without any parsing; CSV files are parsed into the same types.
+
+    Parameters:
+    path (str): Path to a .parquet or .csv output file.
+    columns (list): Only load these columns.
+
+    Returns:
+    pd.DataFrame: The transactions.
+    """
+    if is_parquet_file(path):
+        return _pyarrow().parquet.read_table(path, columns=columns).to_pandas()
+    df = pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False)
+    if "txn_date" in df.columns:
+        df["txn_date"] = pd.to_datetime(df["txn_date"], format="%Y-%m-%d").dt.date
+    if "txn_amount" in df.columns:
+        df["txn_amount"] = pd.to_numeric(df["txn_amount"])
+    return df
+
+
+def iter_result_rows(path, columns=None, batch_size=10000):
+    """
+    Yields lists of at most batch_size rows from a converter output file, each row
+    a tuple of values in the order of columns (the canonical columns by default).
+
+    Parquet files are read one record batch at a time, so large files are never
+    loaded whole. CSV values are yielded as the strings in the file.
+    """
+    columns = columns or TRANSACTION_COLUMNS
+    if is_parquet_file(path):
+        parquet_file = _pyarrow().parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield list(zip(*(batch.column(column).to_pylist() for column in columns)))
+        return
+    with open(path, newline="") as fp:
+        reader = csv.DictReader(fp)
+        rows = []
+        for row in reader:
+            rows.append(tuple(row.get(column) for column in columns))
+            if len(rows) >= batch_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
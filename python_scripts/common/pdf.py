@@ -1,18 +1,106 @@
+import hashlib
+import io
 import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
 import tabula
 from PyPDF2 import PdfReader, PdfWriter
 from dotenv import load_dotenv
-from tabula.errors import CSVParseError
+
+# Decrypted copies of password protected statements, kept in memory backed storage when
+# possible, in a directory only the current user can read
+UNLOCKED_PDF_DIR = os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    "personal_finance-%d" % os.getuid(),
+)
+# Decrypted copies are deleted once older than this, or beyond the newest UNLOCKED_PDF_MAX_FILES
+UNLOCKED_PDF_MAX_AGE_SECONDS = 24 * 3600
+UNLOCKED_PDF_MAX_FILES = 50
+
+
+def _private_dir(directory):
+    """
+    Creates directory with mode 0700 if missing and checks that it is a real directory
+    owned by the current user that nobody else can access, so another local user
+    can't create it first and read the decrypted statements.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or stat.S_IMODE(info.st_mode) != 0o700):
+        raise PermissionError(
+            f"{directory} must be a directory (not a symlink) owned by the current user with mode 0700"
+        )
+    return directory
+
+
+def _evict_unlocked_pdfs(directory, keep):
+    """
+    Deletes the decrypted copies older than UNLOCKED_PDF_MAX_AGE_SECONDS and the oldest
+    ones beyond UNLOCKED_PDF_MAX_FILES, except keep.
+    """
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            entries.append((os.lstat(path).st_mtime, path))
+        except FileNotFoundError:
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - UNLOCKED_PDF_MAX_AGE_SECONDS
+    for position, (modified, path) in enumerate(entries):
+        if path != keep and (modified < cutoff or position >= UNLOCKED_PDF_MAX_FILES):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
 
 def unlock_pdf(pdf_path, env_var_name):
     """
-    Unlocks a password-protected PDF file using the password from the .env file
-    and overwrites the unlocked version to the same path.
+    Decrypts a password-protected PDF file using the password from the .env file
+    without modifying the original file.
+
+    The PDF is decrypted in memory and written once to a per user tmpfs backed
+    directory (/dev/shm when available) under the SHA-256 of the encrypted file, so
+    running again on the same statement reuses the decrypted copy. Copies older than
+    UNLOCKED_PDF_MAX_AGE_SECONDS, or beyond the newest UNLOCKED_PDF_MAX_FILES, are
+    deleted on every call.
 
     Parameters:
         pdf_path (str): The file path of the PDF to unlock.
+        env_var_name (str): Name of the env variable holding the password.
+
+    Returns:
+        str: Path of the decrypted PDF, or pdf_path when the PDF is not encrypted.
     """
+    with open(pdf_path, "rb") as pdf_file:
+        content = pdf_file.read()
+
+    # Read the PDF file
+    reader = PdfReader(io.BytesIO(content))
+
+    if not reader.is_encrypted:
+        print("Specified PDF file is already unlocked.")
+        return pdf_path
+
+    unlocked_dir = _private_dir(UNLOCKED_PDF_DIR)
+    unlocked_path = os.path.join(unlocked_dir, "%s.pdf" % hashlib.sha256(content).hexdigest())
+    _evict_unlocked_pdfs(unlocked_dir, keep=unlocked_path)
+    if os.path.exists(unlocked_path):
+        # Refresh the modification time so the copy in use isn't evicted
+        os.utime(unlocked_path)
+        print(f"Reusing the unlocked PDF at: {unlocked_path}")
+        return unlocked_path
+
     # Load the password from the .env file
     load_dotenv()
     password = os.getenv(env_var_name)
@@ -20,41 +108,142 @@ def unlock_pdf(pdf_path, env_var_name):
     if not password:
         raise ValueError("PDF password not found in the .env file.")
 
-    # Read the PDF file
-    reader = PdfReader(pdf_path)
+    try:
+        decrypted = reader.decrypt(password)
+    except Exception as e:
+        raise ValueError(f"Failed to decrypt PDF: {e}")
+    if not decrypted:
+        raise ValueError("Failed to decrypt PDF: incorrect password")
 
-    if reader.is_encrypted:
-        try:
-            reader.decrypt(password)
-        except Exception as e:
-            raise ValueError(f"Failed to decrypt PDF: {e}")
-    else:
-        print("Specified PDF file is already unlocked.")
-        return
-
-    # Write the unlocked content back to the same file
     writer = PdfWriter()
     for page in reader.pages:
         writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
 
-    with open(pdf_path, "wb") as pdf_file:
-        writer.write(pdf_file)
+    # Write to a temporary name first so that a concurrent run never reads a partial file
+    temp_path = "%s.%s.tmp" % (unlocked_path, os.getpid())
+    with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as pdf_file:
+        pdf_file.write(buffer.getvalue())
+    os.replace(temp_path, unlocked_path)
 
-    print(f"Successfully unlocked and saved the PDF at: {pdf_path}")
+    print(f"Successfully unlocked the PDF at: {pdf_path} to {unlocked_path}")
+    return unlocked_path
 
 
-def extract_tables_from_pdf(pdf_path, coords, coords2, extraction_method):
+def _page_ranges(total_pages, coords, coords2):
     """
-    Extracts tables from a PDF file within given coordinates using Tabula and saves them as CSV files.
+    Groups the pages of a PDF by the table area used on them, as (area, pages) pairs.
+    """
+    if total_pages == 1 or coords == coords2:
+        return [(coords, list(range(1, total_pages + 1)))]
+    return [(coords, [1]), (coords2, list(range(2, total_pages + 1)))]
+
+
+def _split_pages(pages, parts):
+    """
+    Splits a list of pages into at most `parts` contiguous chunks of similar size.
+    """
+    if not pages:
+        return []
+    size = -(-len(pages) // max(parts, 1))
+    return [pages[start:start + size] for start in range(0, len(pages), size)]
+
+
+def _extract_page(pdf_path, area, page_number, extraction_method):
+    """
+    Extracts the table of a single page with its own tabula invocation.
+    Returns None when no table is found.
+    """
+    tables = tabula.read_pdf(
+        pdf_path,
+        area=area,
+        pages=page_number,
+        multiple_tables=False,
+        lattice=(extraction_method == "lattice"),
+        stream=(extraction_method == "stream"),
+        pandas_options={"header": None}
+    )
+    return tables[0] if tables else None
+
+
+def _extract_pages_batched(pdf_path, area, pages, extraction_method):
+    """
+    Extracts the tables of several pages sharing the same area with one tabula invocation.
+
+    Tabula is asked for its JSON output, which carries the page number of every table,
+    and the tables found on a page are stacked the same way multiple_tables=False does.
+
+    Returns:
+        dict: page number -> DataFrame for every page with a table.
+    """
+    raw_tables = tabula.read_pdf(
+        pdf_path,
+        area=area,
+        pages=pages,
+        multiple_tables=True,
+        lattice=(extraction_method == "lattice"),
+        stream=(extraction_method == "stream"),
+        output_format="json",
+    )
+    rows_by_page = {}
+    for table in raw_tables:
+        rows = [[cell["text"] if cell["text"] else np.nan for cell in row] for row in table["data"]]
+        rows_by_page.setdefault(table["page_number"], []).extend(rows)
+    return {page_number: pd.DataFrame(rows) for page_number, rows in rows_by_page.items() if rows}
+
+
+def _extract_pages(pdf_path, area, pages, extraction_method, batch):
+    """
+    Extracts the tables of the given pages, batched when possible and page by page otherwise.
+    A page that fails is recorded and does not stop the remaining pages.
+
+    Returns:
+        tuple: ({page number: DataFrame}, {page number: error message})
+    """
+    if batch:
+        try:
+            return _extract_pages_batched(pdf_path, area, pages, extraction_method), {}
+        except Exception as exc:
+            print("Batched extraction failed for PDF=%s pages=%s, retrying page by page. Exception=%s"
+                  % (pdf_path, pages, exc))
+    tables = {}
+    failures = {}
+    for page_number in pages:
+        try:
+            table = _extract_page(pdf_path, area, page_number, extraction_method)
+        except Exception as exc:
+            print("Error in processing PDF=%s page_number=%s" % (pdf_path, page_number))
+            failures[page_number] = repr(exc)
+            continue
+        if table is not None:
+            tables[page_number] = table
+    return tables, failures
+
+
+def iter_tables_from_pdf(pdf_path, coords, coords2, extraction_method, batch=True, workers=1, statement_path=None):
+    """
+    Extracts tables from a PDF file within given coordinates using Tabula without writing them to disk.
+
+    Each tabula invocation starts a JVM (unless jpype is installed), so by default all the pages
+    sharing an area are extracted in one invocation: at most two for a statement, one for the
+    first page and one for the rest. If a batched invocation fails its pages are retried one by one.
 
     Parameters:
         pdf_path (str): The file path of the PDF.
         coords (list): Coordinates [top, left, bottom, right] for the table on the first page.
         coords2 (list): Coordinates [top, left, bottom, right] for the table on subsequent pages.
         extraction_method (str): The method for extraction ("lattice" or "stream").
+        batch (bool): Extract all pages sharing an area with a single tabula invocation.
+        workers (int): Number of processes to spread the pages over. Each process extracts a
+            contiguous chunk of pages, so long statements are extracted in parallel.
+        statement_path (str): Path the CSV names are derived from. Defaults to pdf_path; pass the
+            original statement when pdf_path is the decrypted copy returned by unlock_pdf.
 
-    Returns:
-        dict: A dictionary where keys are page numbers and values are DataFrames of extracted tables.
+    Yields:
+        tuple: (csv_path, DataFrame) for every page with a table, in page order. csv_path is
+        where extract_tables_from_pdf saves the table ({base}_{n}.csv) and can be used to name
+        files derived from it.
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF file not found at {pdf_path}")
@@ -64,45 +253,57 @@ def extract_tables_from_pdf(pdf_path, coords, coords2, extraction_method):
     total_pages = len(pdf_reader.pages)
 
     extracted_tables = {}
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    output_dir = os.path.dirname(pdf_path)
-    result = []
+    failed_pages = {}
+    statement_path = statement_path if statement_path else pdf_path
+    base_name = os.path.splitext(os.path.basename(statement_path))[0]
+    output_dir = os.path.dirname(statement_path)
 
-    # Iterate through each page of the PDF
-    for page_number in range(1, total_pages + 1):
-        # Use coords for the first page and coords2 for subsequent pages
-        current_coords = coords if page_number == 1 else coords2
-
-        try:
-            tables = tabula.read_pdf(
-                pdf_path,
-                area=current_coords,
-                pages=page_number,
-                multiple_tables=False,
-                lattice=(extraction_method == "lattice"),
-                stream=(extraction_method == "stream"),
-                pandas_options={"header": None}
-            )
-        except CSVParseError as exc:
-            print("Error in processing PDF=%s page_number=%s" % (pdf_path, page_number))
-
-        if tables:
-            extracted_tables[page_number] = tables[0]  # Add the first table found
-
-            # Save the table to a CSV file
-            sequence = len(extracted_tables)
-            output_csv_path = os.path.join(output_dir, f"{base_name}_{sequence}.csv")
-            tables[0].to_csv(output_csv_path, index=False)
-            result.append(output_csv_path)
+    jobs = [
+        (area, chunk)
+        for area, pages in _page_ranges(total_pages, coords, coords2)
+        for chunk in _split_pages(pages, workers)
+    ]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_extract_pages, pdf_path, area, chunk, extraction_method, batch)
+                for area, chunk in jobs
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [_extract_pages(pdf_path, area, chunk, extraction_method, batch) for area, chunk in jobs]
+    for tables, failures in results:
+        extracted_tables.update(tables)
+        failed_pages.update(failures)
 
+    if failed_pages:
+        print("Failed to extract pages=%s of PDF=%s: %s" % (sorted(failed_pages), pdf_path, failed_pages))
     if not extracted_tables:
         print("No tables found within the specified coordinates.")
     else:
-        print(f"Extracted tables from {len(extracted_tables)} pages and saved them as CSV files.")
+        print(f"Extracted tables from {len(extracted_tables)} pages.")
 
+    for sequence, page_number in enumerate(sorted(extracted_tables), start=1):
+        yield os.path.join(output_dir, f"{base_name}_{sequence}.csv"), extracted_tables[page_number]
+
+
+def extract_tables_from_pdf(pdf_path, coords, coords2, extraction_method, batch=True, workers=1, statement_path=None):
+    """
+    Extracts tables from a PDF file within given coordinates using Tabula and saves them as CSV files.
+    See iter_tables_from_pdf for the parameters.
+
+    Returns:
+        list: Paths of the CSV files written, one per page with a table, in page order.
+    """
+    result = []
+    for output_csv_path, table in iter_tables_from_pdf(
+        pdf_path, coords, coords2, extraction_method, batch, workers, statement_path
+    ):
+        table.to_csv(output_csv_path, index=False)
+        result.append(output_csv_path)
     return result
 
 
 if __name__ == "__main__":
-    unlock_pdf("/Users/lokeshsanapalli/projects/personal_finance/statements/credit_cards/oct_2024/icici_oct_2024.pdf", "ICICI_CREDIT_CARD_PASSWORD")
-    extract_tables_from_pdf("/Users/lokeshsanapalli/projects/personal_finance/statements/credit_cards/oct_2024/icici_oct_2024.pdf", [365, 202, 488, 561], "lattice")
\ No newline at end of file
+    statement = "/Users/lokeshsanapalli/projects/personal_finance/statements/credit_cards/oct_2024/icici_oct_2024.pdf"
+    extract_tables_from_pdf(unlock_pdf(statement, "ICICI_CREDIT_CARD_PASSWORD"), [365, 202, 488, 561], [365, 202, 488, 561], "lattice", statement_path=statement)
@@ -1,13 +1,12 @@
-import csv
-import os
 import datetime
 import mimetypes
-import functools
 import re
-from typing import Dict, Optional
+from typing import Optional
 
 import pandas as pd
 
+from .categories import CategoryMatcher, get_category_matcher, categorize_series, explain_category
+
 
 def parse_str_to_float(in_val):
     if isinstance(in_val, float):
@@ -49,36 +48,43 @@ def safe_float(value) -> Optional[float]:
         return None
 
 
+# Currency markers that may precede or follow an amount: "Rs.", "INR", "₹", "`" (the rupee
+# glyph in ICICI PDFs) and the standalone "C" HDFC statements render the rupee symbol as
+AMOUNT_CURRENCY_PATTERN = r"(?i)rs\.?|inr|₹|`|(?<![a-z])c(?![a-z])"
+AMOUNT_NUMBER_PATTERN = r"(\d[\d,]*(?:\.\d+)?|\.\d+)"
+AMOUNT_CREDIT_PATTERN = r"(?i)\+|(?<![a-z])cr(?![a-z])"
+AMOUNT_DEBIT_PATTERN = r"(?i)-|\(|(?<![a-z])dr(?![a-z])"
+
+
+def parse_amounts(series: pd.Series) -> pd.DataFrame:
+    """
+    Parses a column of amounts in one vectorized pass.
+
+    Handles thousands and lakh grouping ("1,23,456.78"), currency symbols, percent signs,
+    and the Cr / Dr / + / - markers statements use to tell credits from debits.
+
+    Parameters:
+    series (pd.Series): Amounts as strings or numbers.
+
+    Returns:
+    pd.DataFrame: Aligned to the index of series, with the columns
+        amount: absolute value as a float, NaN when no number could be found.
+        sign: 1 for credit markers (Cr, +), -1 for debit markers (Dr, -, parentheses)
+            and 0 when the value has no marker.
+    """
+    text = series.map(str, na_action="ignore").astype(object)
+    text = text.where(series.notna(), "")
+    cleaned = text.str.replace(AMOUNT_CURRENCY_PATTERN, " ", regex=True)
+    number = cleaned.str.extract(AMOUNT_NUMBER_PATTERN, expand=False).str.replace(",", "", regex=False)
+    amount = pd.to_numeric(number, errors="coerce").astype(float)
+    sign = pd.Series(0, index=series.index, dtype=int)
+    sign[cleaned.str.contains(AMOUNT_DEBIT_PATTERN, regex=True)] = -1
+    sign[cleaned.str.contains(AMOUNT_CREDIT_PATTERN, regex=True)] = 1
+    return pd.DataFrame({"amount": amount, "sign": sign}, index=series.index)
+
+
 def auto_detect_category(description):
-    result = []
-    with open("config/category_mapping.csv", "r") as fp:
-        reader: csv.DictReader[Dict[str, str]] = csv.DictReader(fp)
-        for row in reader:
-            pattern = re.compile(r"^.*(%s).*$" % row["keyword"].lower())
-            match = re.match(pattern, description.lower())
-            if match is not None and match.group(1):
-                result.append(
-                    (
-                        row["keyword"],
-                        row["category"],
-                        row["tags"],
-                        f'{row["notes"] if row["notes"] else match.group(1)} \n\n source of truth = {description}',
-                    )
-                )
-    if len(result) > 1 and not all(list(map(lambda x: x[1] == result[0][1], result))):
-        most_relevant = functools.reduce(
-            lambda acc, curr: acc if len(acc[0]) > len(curr[0]) else curr,
-            result,
-            ("", "", "", ""),
-        )
-        print(
-            "'%s' detected multiple categories='%s' most_relevant=%s"
-            % (description, result, most_relevant)
-        )
-        return most_relevant[1], most_relevant[2], most_relevant[3]
-    if len(result) > 0:
-        return result[0][1], result[0][2], result[0][3]
-    return "Others", "", f"\n\n source of truth = {description}"
+    return get_category_matcher().detect(description)
 
 
 def clean_string(input_string: str) -> str:
@@ -4,14 +4,14 @@ import re
 import pandas as pd
 
 from common import (
-    auto_detect_category,
-    parse_str_to_float,
+    categorize_series,
+    parse_amounts,
     write_result,
     remove_empty_columns,
     check_file_type,
 )
-from common.csv_utils import convert_date_format
-from common.pdf import unlock_pdf, extract_tables_from_pdf
+from common.csv_utils import convert_date_format, write_debug_artifact
+from common.pdf import unlock_pdf, iter_tables_from_pdf
 
 # Ensure logs directory exists
 os.makedirs('logs', exist_ok=True)
@@ -28,9 +28,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_df(each_filename):
-    """Create and process DataFrame from CSV file with Axis credit card format"""
-    df = pd.read_csv(each_filename, header=0)
+def create_df(each_filename, df=None):
+    """
+    Create and process DataFrame from CSV file with Axis credit card format.
+    When df is given it is used as the raw table instead of reading each_filename,
+    which then only names the debug artifacts.
+    """
+    if df is None:
+        df = pd.read_csv(each_filename, header=0)
     df = remove_empty_columns(df)
     
     # Create new df by mapping column indices to standard format
@@ -47,6 +52,9 @@ def create_df(each_filename):
     
     df = new_df
     
+    # Parse the amount column of the whole table at once
+    amounts = parse_amounts(df["amount"] if "amount" in df.columns else pd.Series("", index=df.index))
+    
     # Process each row to extract and clean data
     processed_rows = []
     
@@ -88,29 +96,20 @@ def create_df(each_filename):
                 logger.warning(f"Row {index}: Missing amount, skipping...")
                 continue
             
-            # Check for Dr or Cr in amount string
-            amount_str_upper = amount_str.upper()
-            if "DR" in amount_str_upper:
+            # Dr or Cr in the amount string decides the transaction type
+            sign = amounts.at[index, "sign"]
+            if sign < 0:
                 txn_type = "Debit"
-                # Remove "Dr" from amount string
-                amount_str = re.sub(r'\s*Dr\s*', '', amount_str, flags=re.IGNORECASE).strip()
-            elif "CR" in amount_str_upper:
+            elif sign > 0:
                 txn_type = "Credit"
-                # Remove "Cr" from amount string
-                amount_str = re.sub(r'\s*Cr\s*', '', amount_str, flags=re.IGNORECASE).strip()
             else:
                 # Default to Debit if not specified
                 logger.warning(f"Row {index}: No Dr/Cr found in amount '{amount_str}', defaulting to Debit")
                 txn_type = "Debit"
             
-            # Clean amount string (remove commas, spaces, etc.)
-            amount_str = amount_str.replace(',', '').replace(' ', '')
-            
-            # Convert to float
-            try:
-                amount = float(amount_str)
-            except ValueError as e:
-                logger.error(f"Row {index}: Could not convert amount '{amount_str}' to float: {e}")
+            amount = amounts.at[index, "amount"]
+            if pd.isna(amount):
+                logger.error(f"Row {index}: Could not convert amount '{amount_str}' to float")
                 continue
             
             # Create processed row
@@ -130,9 +129,7 @@ def create_df(each_filename):
     processed_df = pd.DataFrame(processed_rows)
     
     # Create intermediate modified file
-    temp_file_name, _ = os.path.splitext(each_filename)
-    modified_file = "%s_modified.csv" % temp_file_name
-    processed_df.to_csv(modified_file, index=False, header=True)
+    write_debug_artifact(each_filename, "_modified", processed_df)
     
     return processed_df
 
@@ -146,10 +143,16 @@ def axis_credit_card_processor(filename, output):
         logger.warning(f"No valid transactions found in {filename}")
         return
     
+    process_df(df, output)
+
+
+def process_df(df, output):
+    """Write transactions for a cleaned DataFrame returned by create_df"""
+    categories = categorize_series(df["transaction_details"])
     result = []
     for index, row in df.iterrows():
         # Process all transactions (both Debit and Credit)
-        category, tags, notes = auto_detect_category(row["transaction_details"])
+        category, tags, notes = categories.loc[index]
         
         # Add merchant category to notes if available
         if row["merchant_category"] and str(row["merchant_category"]).strip() != "":
@@ -160,7 +163,7 @@ def axis_credit_card_processor(filename, output):
                 "txn_date": row["txn_date"],
                 "account": "Axis Credit Card",
                 "txn_type": row["txn_type"],
-                "txn_amount": parse_str_to_float(row["amount"]),
+                "txn_amount": row["amount"],
                 "category": category,
                 "tags": tags,
                 "notes": notes,
@@ -175,20 +178,27 @@ def axis_credit_card_adapter(filename, output):
     if check_file_type(filename) == "CSV":
         axis_credit_card_processor(filename, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "AXIS_CREDIT_CARD_PASSWORD")
+        unlocked_filename = unlock_pdf(filename, "AXIS_CREDIT_CARD_PASSWORD")
         # Extract tables from PDF - adjust coordinates based on actual PDF layout
         # Format: [x1, y1, x2, y2] for table area, [x1, y1, x2, y2] for header area
         # These are placeholder coordinates - adjust based on your PDF layout
-        for each_filename in extract_tables_from_pdf(
-            filename, 
+        frames = []
+        for each_filename, table in iter_tables_from_pdf(
+            unlocked_filename, 
             [310, 30, 310+308, 560+30],  # Table area coordinates - adjust as needed
             [310, 30, 310+308, 560+30],   # Header area coordinates - adjust as needed
-            "lattice"
+            "lattice",
+            statement_path=filename,
         ):
+            write_debug_artifact(each_filename, "", table)
             try:
-                temp_file_name, _ = os.path.splitext(each_filename)
-                output_file = "%s_output.csv" % temp_file_name
-                axis_credit_card_processor(each_filename, output_file)
+                df = create_df(each_filename, table)
+                if not df.empty:
+                    frames.append(df)
             except Exception:
                 logger.exception(f"Exception in processing file {each_filename}. Skipping...")
+        if frames:
+            process_df(pd.concat(frames, ignore_index=True), output)
+        else:
+            logger.warning(f"No valid transactions found in {filename}")
 
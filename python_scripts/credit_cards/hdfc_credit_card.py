@@ -6,14 +6,14 @@ import numpy as np
 import pandas as pd
 
 from common import (
-    auto_detect_category,
-    parse_str_to_float,
+    categorize_series,
+    parse_amounts,
     write_result,
     remove_empty_columns,
     check_file_type,
 )
-from common.csv_utils import convert_date_format
-from common.pdf import unlock_pdf, extract_tables_from_pdf
+from common.csv_utils import convert_date_format, write_debug_artifact
+from common.pdf import unlock_pdf, iter_tables_from_pdf
 
 # Ensure logs directory exists
 os.makedirs('logs', exist_ok=True)
@@ -30,9 +30,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_df(each_filename):
-    """Create and process DataFrame from CSV file with new HDFC format"""
-    df = pd.read_csv(each_filename)
+def create_df(each_filename, df=None):
+    """
+    Create and process DataFrame from CSV file with new HDFC format.
+    When df is given it is used as the raw table instead of reading each_filename,
+    which then only names the debug artifacts.
+    """
+    if df is None:
+        df = pd.read_csv(each_filename)
     # Replace standalone "EMI" cells with NaN before dropping empty columns
     df = df.replace(r"^\s*EMI\s*$", np.nan, regex=True).infer_objects(copy=False)
     df = remove_empty_columns(df)
@@ -45,6 +50,11 @@ def create_df(each_filename):
         df = df.drop(df.index[0])
         df = df.reset_index(drop=True)
     
+    # Parse the amount columns of the whole table at once
+    empty = pd.Series("", index=df.index)
+    rewards = parse_amounts(df["REWARDS"] if "REWARDS" in df.columns else empty)
+    amounts = parse_amounts(df["AMOUNT"] if "AMOUNT" in df.columns else empty)
+    
     # Accumulate cleaned rows then build the DataFrame once (avoids concat warnings)
     processed_rows = []
     
@@ -80,40 +90,29 @@ def create_df(each_filename):
             if description.lower() == "nan":
                 description = ""
             
-            # Get rewards and convert to float (handles "+ 10" / "- 5" formats)
+            # Get rewards (handles "+ 10" / "- 5" formats)
             rewards_str = str(row.get("REWARDS", "")).strip()
             rewards_value = 0.0
             if rewards_str and rewards_str.lower() != "nan":
-                rewards_clean = rewards_str.replace(',', '')
-                # Remove spaces after leading sign if present (e.g., "+ 10" -> "+10")
-                rewards_clean = re.sub(r'^([+-])\s+', r'\1', rewards_clean)
-                try:
-                    rewards_value = float(rewards_clean)
-                except ValueError as e:
-                    logger.error(f"Could not convert rewards to float: {rewards_str}, error: {e}")
+                rewards_value = rewards.at[index, "amount"]
+                if pd.isna(rewards_value):
+                    logger.error(f"Could not convert rewards to float: {rewards_str}")
                     continue
+                if rewards.at[index, "sign"] < 0:
+                    rewards_value = -rewards_value
             
             # Get amount
             amount_str = str(row.get("AMOUNT", "")).strip()
             if not amount_str or amount_str.lower() == "nan":
                 continue
             
-            # Check if "+" is present to determine Debit/Credit
-            is_credit = "+" in amount_str
-            
-            # Remove "C" prefix with spaces around it
-            amount_str = re.sub(r'\s*C\s*', '', amount_str, flags=re.IGNORECASE)
-            amount_str = amount_str.strip()
-            
-            # Remove commas and convert to float
-            try:
-                amount = float(amount_str.replace(',', ''))
-            except ValueError as e:
-                logger.error(f"Could not convert amount to float: {amount_str}, error: {e}")
+            amount = amounts.at[index, "amount"]
+            if pd.isna(amount):
+                logger.error(f"Could not convert amount to float: {amount_str}")
                 continue
             
-            # Determine transaction type
-            txn_type = "Credit" if is_credit else "Debit"
+            # A "+" marks a credit
+            txn_type = "Credit" if amounts.at[index, "sign"] > 0 else "Debit"
 
             # Credit rows should carry negative amounts upfront
             amount = -abs(amount) if txn_type == "Credit" else abs(amount)
@@ -132,11 +131,8 @@ def create_df(each_filename):
     
     new_df = pd.DataFrame(processed_rows, columns=["Date", "Description", "Rewards", "Amount", "Debit / Credit"])
 
-    # Output to _modified.csv
-    temp_file_name, _ = os.path.splitext(each_filename)
-    modified_file = "%s_modified.csv" % temp_file_name
-    new_df.to_csv(modified_file, index=False, header=True)
-    
+    write_debug_artifact(each_filename, "_modified", new_df)
+
     return new_df
 
 
@@ -152,22 +148,27 @@ def hdfc_credit_card_processor(filename, output):
         df = create_df(filename)
     if df.empty:
         df = create_df(filename)
+    process_df(df, output)
 
+
+def process_df(df, output):
+    """Write transactions for a normalized DataFrame (Date, Description, Rewards, Amount, Debit / Credit)"""
+    categories = categorize_series(df["Description"])
+    amounts = parse_amounts(df["Amount"])
     result = []
-    for _, row in df.iterrows():
+    for index, row in df.iterrows():
         source_txn_type = str(row["Debit / Credit"]).strip().title()
         if source_txn_type not in {"Debit", "Credit"}:
             continue
 
-        description = str(row["Description"])
         txn_type = "Credit" if source_txn_type == "Credit" else "Debit"
 
-        amount_value = parse_str_to_float(row["Amount"])
-        if amount_value is None:
+        amount_value = amounts.at[index, "amount"]
+        if pd.isna(amount_value):
             continue
-        txn_amount = -abs(amount_value) if txn_type == "Credit" else abs(amount_value)
+        txn_amount = -amount_value if txn_type == "Credit" else amount_value
 
-        category, tags, notes = auto_detect_category(description)
+        category, tags, notes = categories.loc[index]
         result.append(
             {
                 "txn_date": row["Date"],
@@ -186,9 +187,13 @@ def hdfc_credit_card_adapter(filename, output):
     if check_file_type(filename) == "CSV":
         hdfc_credit_card_processor(filename, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "HDFC_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(filename, [702, 161, 692+129, 162+405], [262, 18, 262+248, 18+542], "stream"):
+        unlocked_filename = unlock_pdf(filename, "HDFC_CREDIT_CARD_PASSWORD")
+        frames = []
+        for each_filename, table in iter_tables_from_pdf(unlocked_filename, [702, 161, 692+129, 162+405], [262, 18, 262+248, 18+542], "stream", statement_path=filename):
+            write_debug_artifact(each_filename, "", table)
             try:
-                create_df(each_filename)
+                frames.append(create_df(each_filename, table))
             except Exception:
                 logger.exception(f"Exception in processing file {each_filename}. Skipping...")
+        if frames:
+            process_df(pd.concat(frames, ignore_index=True), output)
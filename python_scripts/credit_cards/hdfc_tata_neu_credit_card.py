@@ -6,14 +6,14 @@ import numpy as np
 import pandas as pd
 
 from common import (
-    auto_detect_category,
-    parse_str_to_float,
+    categorize_series,
+    parse_amounts,
     write_result,
     remove_empty_columns,
     check_file_type,
 )
-from common.csv_utils import convert_date_format
-from common.pdf import unlock_pdf, extract_tables_from_pdf
+from common.csv_utils import convert_date_format, write_debug_artifact
+from common.pdf import unlock_pdf, iter_tables_from_pdf
 
 # Ensure logs directory exists
 os.makedirs('logs', exist_ok=True)
@@ -30,9 +30,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_df(each_filename):
-    """Create and process DataFrame from CSV file with HDFC Tata Neu format"""
-    df = pd.read_csv(each_filename)
+def create_df(each_filename, df=None):
+    """
+    Create and process DataFrame from CSV file with HDFC Tata Neu format.
+    When df is given it is used as the raw table instead of reading each_filename,
+    which then only names the debug artifacts.
+    """
+    if df is None:
+        df = pd.read_csv(each_filename)
     # Replace standalone "EMI" cells with NaN before dropping empty columns
     df = df.replace(r"^\s*EMI\s*$", np.nan, regex=True).infer_objects(copy=False)
     df = remove_empty_columns(df)
@@ -42,6 +47,11 @@ def create_df(each_filename):
         df.columns = df.iloc[0]
         df = df.drop(df.index[0]).reset_index(drop=True)
     
+    # Parse the amount columns of the whole table at once
+    empty = pd.Series("", index=df.index)
+    neucoins = parse_amounts(df["Base NeuCoins*"] if "Base NeuCoins*" in df.columns else empty)
+    amounts = parse_amounts(df["AMOUNT"] if "AMOUNT" in df.columns else empty)
+    
     processed_rows = []
     
     for index, row in df.iterrows():
@@ -69,33 +79,25 @@ def create_df(each_filename):
             if description.lower() == "nan":
                 description = ""
             
+            # NeuCoins are kept without their "+ " / "- " prefix, missing values stay NaN
             neucoins_str = str(row.get("Base NeuCoins*", "")).strip()
-            neucoins_value = 0.0
-            neucoins_clean = neucoins_str.replace(',', '')
-            neucoins_clean = re.sub(r'^([+-])\s+', r'', neucoins_clean)
-            try:
-                neucoins_value = float(neucoins_clean)
-            except ValueError as e:
-                logger.error(f"Could not convert neucoins to float: {neucoins_str}, error: {e}")
+            neucoins_value = neucoins.at[index, "amount"]
+            if pd.isna(neucoins_value) and neucoins_str.lower() != "nan":
+                logger.error(f"Could not convert neucoins to float: {neucoins_str}")
                 continue
             
             amount_str = str(row.get("AMOUNT", "")).strip()
             if not amount_str or amount_str.lower() == "nan":
                 continue
             
-            is_credit = "+" in amount_str
-            
-            # Remove standalone "C" blocks (handles "C ", "+ C ") before conversion
-            amount_str = re.sub(r'\s*C\s*', '', amount_str, flags=re.IGNORECASE).strip()
-            
-            try:
-                amount = float(amount_str.replace(',', ''))
-            except ValueError as e:
-                logger.error(f"Could not convert amount to float: {amount_str}, error: {e}")
+            # parse_amounts drops the standalone "C" blocks ("C ", "+ C ") and flags "+" as a credit
+            amount = amounts.at[index, "amount"]
+            if pd.isna(amount):
+                logger.error(f"Could not convert amount to float: {amount_str}")
                 continue
             
-            txn_type = "Credit" if is_credit else "Debit"
-            amount = -abs(amount) if txn_type == "Credit" else abs(amount)
+            txn_type = "Credit" if amounts.at[index, "sign"] > 0 else "Debit"
+            amount = -amount if txn_type == "Credit" else amount
             
             processed_rows.append({
                 "Date": formatted_date,
@@ -114,10 +116,8 @@ def create_df(each_filename):
         columns=["Date", "Description", "NeuCoins", "Amount", "Debit / Credit"],
     )
     
-    temp_file_name, _ = os.path.splitext(each_filename)
-    modified_file = "%s_modified.csv" % temp_file_name
-    new_df.to_csv(modified_file, index=False, header=True)
-    
+    write_debug_artifact(each_filename, "_modified", new_df)
+
     return new_df
 
 
@@ -126,22 +126,27 @@ def hdfc_credit_card_processor(filename, output):
         filename,
         usecols=["Date", "Description", "Amount", "Debit / Credit"],
     )
+    process_df(df, output)
 
+
+def process_df(df, output):
+    """Write transactions for a normalized DataFrame (Date, Description, NeuCoins, Amount, Debit / Credit)"""
+    categories = categorize_series(df["Description"])
+    amounts = parse_amounts(df["Amount"])
     result = []
-    for _, row in df.iterrows():
+    for index, row in df.iterrows():
         source_txn_type = str(row["Debit / Credit"]).strip().title()
         if source_txn_type not in {"Debit", "Credit"}:
             continue
 
-        description = str(row["Description"])
         txn_type = "Credit" if source_txn_type == "Credit" else "Debit"
 
-        amount_value = parse_str_to_float(row["Amount"])
-        if amount_value is None:
+        amount_value = amounts.at[index, "amount"]
+        if pd.isna(amount_value):
             continue
-        txn_amount = -abs(amount_value) if txn_type == "Credit" else abs(amount_value)
+        txn_amount = -amount_value if txn_type == "Credit" else amount_value
 
-        category, tags, notes = auto_detect_category(description)
+        category, tags, notes = categories.loc[index]
         result.append(
             {
                 "txn_date": row["Date"],
@@ -160,14 +165,19 @@ def hdfc_tata_neu_credit_card_adapter(filename, output):
     if check_file_type(filename) == "CSV":
         hdfc_credit_card_processor(filename, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "HDFC_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(
-            filename,
+        unlocked_filename = unlock_pdf(filename, "HDFC_CREDIT_CARD_PASSWORD")
+        frames = []
+        for each_filename, table in iter_tables_from_pdf(
+            unlocked_filename,
             [744, 162, 728 + 72, 162 + 400],
             [262, 18, 262 + 369, 18 + 540],
             "stream",
+            statement_path=filename,
         ):
+            write_debug_artifact(each_filename, "", table)
             try:
-                create_df(each_filename)
+                frames.append(create_df(each_filename, table))
             except Exception:
                 logger.exception(f"Exception in processing file {each_filename}. Skipping...")
+        if frames:
+            process_df(pd.concat(frames, ignore_index=True), output)
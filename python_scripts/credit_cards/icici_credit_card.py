@@ -1,11 +1,11 @@
-import os
 import traceback
 
 import pandas as pd
 
-from common import remove_empty_rows, remove_empty_columns, parse_str_to_float, check_csv_header_df, fix_date_format_df, \
-    auto_detect_category, write_result, write_result_df, check_file_type, is_valid_date
-from common.pdf import unlock_pdf, extract_tables_from_pdf
+from common import remove_empty_rows, remove_empty_columns, parse_amounts, check_csv_header_df, fix_date_format_df, \
+    categorize_series, write_result, check_file_type, is_valid_date
+from common.csv_utils import write_debug_artifact
+from common.pdf import unlock_pdf, iter_tables_from_pdf
 
 
 def icici_cc_fix_date_format_df(df):
@@ -35,16 +35,28 @@ def safe_at(df, row_label, col_label):
         return None  # or any default value you prefer
 
 
-def icici_credit_card_adapter_old(filename, out_filename):
-    df = pd.read_csv(filename, header=None)
+def amounts_of(df, column):
+    """Parses the amount column of the whole table at once, "123.45 CR" marks a credit."""
+    return parse_amounts(df[column] if column in df.columns else pd.Series("", index=df.index))
+
+
+def icici_transactions(df, filename):
+    """
+    Converts a raw ICICI statement table with positional columns into transaction rows.
+    filename only names the debug artifacts.
+    """
     df = clean(df)
     columns = ["Date", "Sr.No.", "Transaction Details", "Reward Points", "Intl Amount", "Amount", "Type"]
     if (safe_at(df, 0, 0) and safe_at(df, 0, 0) == 'Date SerNo.'
             and safe_at(df, 0, 1) and safe_at(df, 0, 1) == 'Transaction Details'):
+        amounts = amounts_of(df, 4)
         new_data = []
         for index, row in df.iterrows():
             if row[1] == "Transaction Details" or row[4] == "Amount (in`)" or pd.isna(row[0]) or pd.isna(row[1]) or pd.isna(row[4]):
                 continue
+            # Amounts without a number used to fail float() and be skipped
+            if pd.isna(amounts.at[index, "amount"]):
+                continue
             try:
                 new_data.append({
                     columns[0]: row[0].split(" ")[0],
@@ -52,17 +64,18 @@ def icici_credit_card_adapter_old(filename, out_filename):
                     columns[2]: row[1],
                     columns[3]: row[2],
                     columns[4]: 0 if pd.isna(row[3]) else row[3],
-                    columns[5]: parse_str_to_float(row[4] if isinstance(row[4], float) else row[4].lower().split("cr")[0]),
-                    columns[6]: "Credit" if isinstance(row[4], str) and "cr" in row[4].lower() else "Debit",
+                    columns[5]: amounts.at[index, "amount"],
+                    columns[6]: "Credit" if amounts.at[index, "sign"] > 0 else "Debit",
                 })
             except (ValueError, KeyError):
                 pass
         df = pd.DataFrame(new_data)
     else:
+        amounts = amounts_of(df, 5)
         new_data = []
         for index, row in df.iterrows():
             try:
-                if not is_valid_date(row[0], "%d/%m/%Y"):
+                if not is_valid_date(row[0], "%d/%m/%Y") or pd.isna(amounts.at[index, "amount"]):
                     continue
                 new_data.append({
                     columns[0]: row[0],
@@ -70,17 +83,18 @@ def icici_credit_card_adapter_old(filename, out_filename):
                     columns[2]: row[2],
                     columns[3]: row[3],
                     columns[4]: row[4],
-                    columns[5]: parse_str_to_float(row[5] if isinstance(row[5], float) else row[5].lower().split("cr")[0]),
-                    columns[6]: "Credit" if isinstance(row[5], str) and "cr" in row[5].lower() else "Debit",
+                    columns[5]: amounts.at[index, "amount"],
+                    columns[6]: "Credit" if amounts.at[index, "sign"] > 0 else "Debit",
                 })
             except (ValueError, KeyError):
                 pass
         df = pd.DataFrame(new_data)
     df = icici_cc_fix_date_format_df(df)
+    categories = categorize_series(df["Transaction Details"]) if check_csv_header_df(df, "Transaction Details") else None
     result = []
     for index, row in df.iterrows():
         if row["Type"] == "Debit":
-            category, tags, notes = auto_detect_category(row["Transaction Details"])
+            category, tags, notes = categories.loc[index]
             result.append(
                 {
                     "txn_date": row["Date"],
@@ -92,29 +106,31 @@ def icici_credit_card_adapter_old(filename, out_filename):
                     "notes": notes,
                 }
             )
-    write_result(out_filename, result)
-    temp_file_name, _ = os.path.splitext(filename)
-    modified_filename = "%s_modified.csv" % temp_file_name
-    write_result_df(modified_filename, df)
+    write_debug_artifact(filename, "_modified", df)
+    return result
+
+
+def icici_credit_card_adapter_old(filename, out_filename):
+    df = pd.read_csv(filename, header=None)
+    write_result(out_filename, icici_transactions(df, filename))
 
 
 def icici_credit_card_adapter(filename, out_filename):
     if check_file_type(filename) == "CSV":
         icici_credit_card_adapter_old(filename, out_filename)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "ICICI_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(filename, [365, 202, 615, 561], [60, 32, 303, 590], "stream"):
+        unlocked_filename = unlock_pdf(filename, "ICICI_CREDIT_CARD_PASSWORD")
+        result = []
+        for each_filename, table in iter_tables_from_pdf(unlocked_filename, [365, 202, 615, 561], [60, 32, 303, 590], "stream", statement_path=filename):
+            write_debug_artifact(each_filename, "", table)
             try:
-                df = pd.read_csv(each_filename, header=None)
-                # Drop the first row
-                df = df.drop(0)
-                df = remove_empty_columns(df)
-                df.to_csv(each_filename, index=False, header=False)
-                temp_file_name, _ = os.path.splitext(each_filename)
-                output_file = "%s_output.csv" % temp_file_name
-                icici_credit_card_adapter_old(each_filename, output_file)
+                df = remove_empty_columns(table)
+                # Number the remaining columns 0..n like reading the table back with header=None did
+                df = df.set_axis(range(len(df.columns)), axis=1).reset_index(drop=True)
+                result.extend(icici_transactions(df, each_filename))
             except Exception as exc:
                 print(f"Exception in processing file {each_filename}. Skipping... Exception={traceback.format_exc()}")
+        write_result(out_filename, result)
 
 if __name__ == "__main__":
     icici_credit_card_adapter("/Users/lokeshsanapalli/projects/personal_finance/statements/credit_cards/oct_2024/icici_oct_2024.pdf", "/Users/lokeshsanapalli/projects/personal_finance/statements/credit_cards/oct_2024/icici_oct_2024_output.csv")
\ No newline at end of file
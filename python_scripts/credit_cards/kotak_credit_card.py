@@ -2,6 +2,8 @@ import common
 import csv
 import os
 
+import pandas as pd
+
 
 def kotak_cc_fix_date_format(file_path, rewrite=False):
     common.fix_date_format(file_path, "Date", "%d/%m/%Y", rewrite=rewrite)
@@ -13,36 +15,40 @@ def kotak_credit_card_adapter(filename, out_filename):
     result = []
     result2 = []
     with open(filename, "r") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if "cr" not in row[columns[2]].lower():
-                category, tags, notes = common.auto_detect_category(columns[1])
-                result.append(
-                    {
-                        "txn_date": common.convert_date_format(row[columns[0]], "%d/%m/%Y", "%Y-%m-%d"),
-                        "account": "Kotak Credit Card",
-                        "txn_type": "Debit",
-                        "txn_amount": common.parse_str_to_float(row[columns[2]]),
-                        "category": category,
-                        "tags": tags,
-                        "notes": notes,
-                    }
-                )
-                result2.append({
-                    "Date": row[columns[0]],
-                    "Transaction details": row[columns[1]],
-                    "Spends Area": row["Spends Area"],
-                    "Transaction Type": "Dr",
-                    "Amount (Rs.)": common.parse_str_to_float(row[columns[2]]),
-                })
-            else:
-                result2.append({
-                    "Date": row[columns[0]],
-                    "Transaction details": row[columns[1]],
-                    "Spends Area": row["Spends Area"],
-                    "Transaction Type": "Cr",
-                    "Amount (Rs.)": common.parse_str_to_float(row[columns[2]].lower().split("cr")[0]),
-                })
+        rows = list(csv.DictReader(csvfile))
+    # Parse the amount column at once, credits end with "Cr"
+    amounts = common.parse_amounts(pd.Series([row[columns[2]] for row in rows], dtype=object))
+    amounts["amount"] = amounts["amount"].fillna(0.0)
+    for index, row in enumerate(rows):
+        amount = amounts.at[index, "amount"]
+        if amounts.at[index, "sign"] <= 0:
+            category, tags, notes = common.auto_detect_category(columns[1])
+            result.append(
+                {
+                    "txn_date": common.convert_date_format(row[columns[0]], "%d/%m/%Y", "%Y-%m-%d"),
+                    "account": "Kotak Credit Card",
+                    "txn_type": "Debit",
+                    "txn_amount": amount,
+                    "category": category,
+                    "tags": tags,
+                    "notes": notes,
+                }
+            )
+            result2.append({
+                "Date": row[columns[0]],
+                "Transaction details": row[columns[1]],
+                "Spends Area": row["Spends Area"],
+                "Transaction Type": "Dr",
+                "Amount (Rs.)": amount,
+            })
+        else:
+            result2.append({
+                "Date": row[columns[0]],
+                "Transaction details": row[columns[1]],
+                "Spends Area": row["Spends Area"],
+                "Transaction Type": "Cr",
+                "Amount (Rs.)": amount,
+            })
     common.write_result(out_filename, result)
     temp_file_name, _ = os.path.splitext(filename)
     common.write_result("%s_converted.csv" % temp_file_name, result2, headers=columns + ["Transaction Type", "Spends Area"])
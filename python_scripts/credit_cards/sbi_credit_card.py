@@ -1,19 +1,18 @@
 import math
-import os
 import traceback
 
 import pandas as pd
 
 from common import (
     fix_date_format_df,
-    auto_detect_category,
+    categorize_series,
     check_csv_header_df,
     remove_empty_columns,
     write_result,
-    write_result_df,
-    rename_columns, check_file_type, is_valid_date, parse_str_to_float
+    rename_columns, check_file_type, is_valid_date, parse_amounts
 )
-from common.pdf import unlock_pdf, extract_tables_from_pdf
+from common.csv_utils import write_debug_artifact
+from common.pdf import unlock_pdf, iter_tables_from_pdf
 
 
 def clean(df):
@@ -51,11 +50,16 @@ def clean_rows(df):
     return df
 
 
-def create_df(filename, drop_first_row=False):
-    """Create a cleaned SBI credit card DataFrame, mirroring HDFC adapter flow."""
+def create_df(filename, drop_first_row=False, df=None):
+    """
+    Create a cleaned SBI credit card DataFrame, mirroring HDFC adapter flow.
+    When df is given it is used as the raw table instead of reading filename,
+    which then only names the debug artifacts.
+    """
     extra_empty_column = False
     columns = ["Date", "Transaction Details", "Amount", "Type"]
-    df = pd.read_csv(filename, on_bad_lines="skip")
+    if df is None:
+        df = pd.read_csv(filename, on_bad_lines="skip")
     df = remove_empty_columns(df)
 
     if drop_first_row and not df.empty:
@@ -71,9 +75,7 @@ def create_df(filename, drop_first_row=False):
     df = clean(df)
     df = sbi_cc_fix_date_format_df(df)
 
-    temp_file_name, _ = os.path.splitext(filename)
-    modified_filename = "%s_modified.csv" % temp_file_name
-    write_result_df(modified_filename, df)
+    write_debug_artifact(filename, "_modified", df)
     return df
 
 
@@ -81,6 +83,8 @@ def process_sbi_df(df, out_filename):
     if df is None or df.empty:
         return
 
+    categories = categorize_series(df["Transaction Details"])
+    amounts = parse_amounts(df["Amount"])
     result = []
     for index, row in df.iterrows():
         source_type = str(row.get("Type", "")).strip().upper()
@@ -91,15 +95,12 @@ def process_sbi_df(df, out_filename):
         else:
             continue
 
-        transaction_details = str(row.get("Transaction Details", ""))
-        category, tags, notes = auto_detect_category(transaction_details)
-        amount_value = parse_str_to_float(row.get("Amount"))
-        if amount_value is None:
+        category, tags, notes = categories.loc[index]
+        amount_value = amounts.at[index, "amount"]
+        if pd.isna(amount_value):
             continue
         if txn_type == "Credit":
-            amount_value = -abs(amount_value)
-        elif txn_type == "Debit":
-            amount_value = abs(amount_value)
+            amount_value = -amount_value
 
         result.append(
             {
@@ -120,20 +121,26 @@ def sbi_credit_card_adapter_old(filename, out_filename):
     process_sbi_df(df, out_filename)
 
 
+def process_sbi_pdf(filename, output, password_env_var, coords):
+    """Extract the transaction tables of an SBI credit card PDF and write them to output."""
+    unlocked_filename = unlock_pdf(filename, password_env_var)
+    frames = []
+    for each_filename, table in iter_tables_from_pdf(unlocked_filename, coords, coords, "stream", statement_path=filename):
+        write_debug_artifact(each_filename, "", table)
+        try:
+            frames.append(create_df(each_filename, drop_first_row=True, df=table))
+        except Exception:
+            print(f"Exception in processing file {each_filename}. Skipping... Exception={traceback.format_exc()}")
+    if frames:
+        process_sbi_df(pd.concat(frames, ignore_index=True), output)
+
+
 def sbi_credit_card_adapter(filename, output):
     if check_file_type(filename) == "CSV":
         df = pd.read_csv(filename, names=["Date", "Transaction Details", "Amount", "Type"])
         process_sbi_df(df, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "SBI_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(filename, [517, 16, 833, 427], [517, 16, 833, 427], "stream"):
-            try:
-                df = create_df(each_filename, drop_first_row=True)
-                temp_file_name, _ = os.path.splitext(each_filename)
-                output_file = "%s_output.csv" % temp_file_name
-                process_sbi_df(df, output_file)
-            except Exception:
-                print(f"Exception in processing file {each_filename}. Skipping... Exception={traceback.format_exc()}")
+        process_sbi_pdf(filename, output, "SBI_CREDIT_CARD_PASSWORD", [517, 16, 833, 427])
 
 
 def sbi2_credit_card_adapter(filename, output):
@@ -141,15 +148,7 @@ def sbi2_credit_card_adapter(filename, output):
         df = pd.read_csv(filename, names=["Date", "Transaction Details", "Amount", "Type"])
         process_sbi_df(df, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "SBI2_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(filename, [430, 16, 669, 428], [430, 16, 669, 428], "stream"):
-            try:
-                df = create_df(each_filename, drop_first_row=True)
-                temp_file_name, _ = os.path.splitext(each_filename)
-                output_file = "%s_output.csv" % temp_file_name
-                process_sbi_df(df, output_file)
-            except Exception:
-                print(f"Exception in processing file {each_filename}. Skipping... Exception={traceback.format_exc()}")
+        process_sbi_pdf(filename, output, "SBI2_CREDIT_CARD_PASSWORD", [430, 16, 669, 428])
 
 
 def sbi3_credit_card_adapter(filename, output):
@@ -157,12 +156,4 @@ def sbi3_credit_card_adapter(filename, output):
         df = pd.read_csv(filename, names=["Date", "Transaction Details", "Amount", "Type"])
         process_sbi_df(df, output)
     elif check_file_type(filename) == "PDF":
-        unlock_pdf(filename, "SBI3_CREDIT_CARD_PASSWORD")
-        for each_filename in extract_tables_from_pdf(filename, [430, 16, 340+241, 190+408], [430, 16, 340+241, 190+408], "stream"):
-            try:
-                df = create_df(each_filename, drop_first_row=True)
-                temp_file_name, _ = os.path.splitext(each_filename)
-                output_file = "%s_output.csv" % temp_file_name
-                process_sbi_df(df, output_file)
-            except Exception:
-                print(f"Exception in processing file {each_filename}. Skipping... Exception={traceback.format_exc()}")
+        process_sbi_pdf(filename, output, "SBI3_CREDIT_CARD_PASSWORD", [430, 16, 340+241, 190+408])
@@ -1,7 +1,15 @@
 import argparse
+import csv
+import hashlib
 import os
+from collections import OrderedDict
+
 import pandas as pd
 
+# Number of row digests remembered for --dedup. Duplicates further apart than
+# this many distinct rows are not detected, which keeps memory bounded.
+DEDUP_WINDOW = 1_000_000
+
 
 def validate_headers(files):
     header = None
@@ -14,7 +22,65 @@ def validate_headers(files):
     return header
 
 
-def merge_csv_files(input_files, output_file):
+def iter_unique_rows(rows, window=DEDUP_WINDOW):
+    """
+    Yields the rows that were not seen among the last `window` distinct rows.
+
+    Only a 16 byte digest of each row is kept, in insertion order, so the oldest
+    digests are forgotten once the window is full.
+    """
+    seen = OrderedDict()
+    for row in rows:
+        digest = hashlib.blake2b("\x1f".join(row).encode(), digest_size=16).digest()
+        if digest in seen:
+            seen.move_to_end(digest)
+            continue
+        seen[digest] = None
+        if len(seen) > window:
+            seen.popitem(last=False)
+        yield row
+
+
+def stream_csv_files(input_files, output_file, dedup=False, dedup_window=DEDUP_WINDOW):
+    """
+    Merges CSV files row by row without loading them into memory.
+
+    Rows are copied as they are read, so values keep their original text instead of
+    going through pandas type inference.
+
+    Parameters:
+    input_files (list): Paths of the CSV files to merge, all with the same header.
+    output_file (str): Path of the merged CSV.
+    dedup (bool): Drop rows identical to one already written (see iter_unique_rows).
+    dedup_window (int): Number of distinct rows remembered for dedup.
+
+    Returns:
+    int: Number of rows written, excluding the header.
+    """
+    header = validate_headers(input_files)
+
+    def rows():
+        for file in input_files:
+            with open(file, newline="") as fp:
+                reader = csv.reader(fp)
+                next(reader, None)
+                yield from reader
+
+    written = 0
+    with open(output_file, "w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(header)
+        for row in iter_unique_rows(rows(), dedup_window) if dedup else rows():
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def merge_csv_files(input_files, output_file, stream=False, dedup=False, dedup_window=DEDUP_WINDOW):
+    if stream or dedup:
+        written = stream_csv_files(input_files, output_file, dedup, dedup_window)
+        print(f"Merged {written} rows, CSV saved to {output_file}")
+        return
     validate_headers(input_files)
     dataframes = [pd.read_csv(file) for file in input_files]
     merged_df = pd.concat(dataframes, ignore_index=True)
@@ -26,6 +92,11 @@ def main():
     parser = argparse.ArgumentParser(description="Merge multiple CSV files with the same headers.")
     parser.add_argument('input_files', metavar='input_files', type=str, nargs='+', help='Paths to input CSV files')
     parser.add_argument('--output', '-o', type=str, help='Output file name (optional)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Copy rows one at a time instead of loading every file into memory')
+    parser.add_argument('--dedup', action='store_true', help='Skip duplicate rows (implies --stream)')
+    parser.add_argument('--dedup-window', type=int, default=DEDUP_WINDOW,
+                        help=f'Number of distinct rows remembered for --dedup (default: {DEDUP_WINDOW})')
 
     args = parser.parse_args()
     input_files = args.input_files
@@ -33,7 +104,7 @@ def main():
                                                                                                                 '_output.csv')
                                                                )
 
-    merge_csv_files(input_files, output_file)
+    merge_csv_files(input_files, output_file, args.stream, args.dedup, args.dedup_window)
 
 
 if __name__ == "__main__":
@@ -1,36 +1,242 @@
 import argparse
+import csv
+import importlib
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from bank_accounts import *
-from credit_cards import *
-from credit_cards.hdfc_tata_neu_credit_card import hdfc_tata_neu_credit_card_adapter
+from common.constants import Account
+
+# Adapters are imported on first use, so --help and single statement runs only
+# pay for the modules (and the PDF tooling) they actually need.
+ADAPTERS = {
+    Account.HDFC_BANK_ACCOUNT: ("bank_accounts.hdfc_bank_account", "hdfc_bank_account_adapter"),
+    Account.KOTAK_BANK_ACCOUNT: ("bank_accounts.kotak_bank_account", "kotak_bank_account_adapter"),
+    Account.EQUITAS_BANK_ACCOUNT: ("bank_accounts.equitas_bank_account", "equitas_bank_account_adapter"),
+    Account.SBI_CREDIT_CARD: ("credit_cards.sbi_credit_card", "sbi_credit_card_adapter"),
+    Account.SBI2_CREDIT_CARD: ("credit_cards.sbi_credit_card", "sbi2_credit_card_adapter"),
+    Account.SBI3_CREDIT_CARD: ("credit_cards.sbi_credit_card", "sbi3_credit_card_adapter"),
+    Account.HDFC_CREDIT_CARD: ("credit_cards.hdfc_credit_card", "hdfc_credit_card_adapter"),
+    Account.HDFC_TATA_NEU_CREDIT_CARD: ("credit_cards.hdfc_tata_neu_credit_card", "hdfc_tata_neu_credit_card_adapter"),
+    Account.KOTAK_CREDIT_CARD: ("credit_cards.kotak_credit_card", "kotak_credit_card_adapter"),
+    Account.ICICI_CREDIT_CARD: ("credit_cards.icici_credit_card", "icici_credit_card_adapter"),
+    Account.AXIS_CREDIT_CARD: ("credit_cards.axis_credit_card", "axis_credit_card_adapter"),
+}
+
+# Statement file extensions each adapter reads, the card adapters take both the
+# PDF statement and its CSV export.
+STATEMENT_EXTENSIONS = {
+    Account.HDFC_BANK_ACCOUNT: (".xls", ".xlsx"),
+    Account.KOTAK_BANK_ACCOUNT: (".csv",),
+    Account.EQUITAS_BANK_ACCOUNT: (".csv",),
+    Account.KOTAK_CREDIT_CARD: (".csv",),
+}
+DEFAULT_STATEMENT_EXTENSIONS = (".pdf", ".csv")
 
 
 def bank_account_adapter(account_type):
-    if account_type == Account.HDFC_BANK_ACCOUNT.name:
-        return hdfc_bank_account_adapter
-    elif account_type == Account.KOTAK_BANK_ACCOUNT.name:
-        return kotak_bank_account_adapter
-    elif account_type == Account.SBI_CREDIT_CARD.name:
-        return sbi_credit_card_adapter
-    elif account_type == Account.SBI2_CREDIT_CARD.name:
-        return sbi2_credit_card_adapter
-    elif account_type == Account.SBI3_CREDIT_CARD.name:
-        return sbi3_credit_card_adapter
-    elif account_type == Account.HDFC_CREDIT_CARD.name:
-        return hdfc_credit_card_adapter
-    elif account_type == Account.HDFC_TATA_NEU_CREDIT_CARD.name:
-        return hdfc_tata_neu_credit_card_adapter
-    elif account_type == Account.KOTAK_CREDIT_CARD.name:
-        return kotak_credit_card_adapter
-    elif account_type == Account.ICICI_CREDIT_CARD.name:
-        return icici_credit_card_adapter
-    elif account_type == Account.EQUITAS_BANK_ACCOUNT.name:
-        return equitas_bank_account_adapter
-    elif account_type == Account.AXIS_CREDIT_CARD.name:
-        return axis_credit_card_adapter
+    """
+    Returns the adapter function for the given Account name, importing its module
+    on first use. Returns None for accounts without a statement adapter.
+    """
+    adapter = ADAPTERS.get(Account[account_type])
+    if adapter is None:
+        return None
+    module_name, function_name = adapter
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def default_output_file(path, output_format="csv"):
+    temp_file_name, _ = os.path.splitext(path)
+    return "%s_output.%s" % (temp_file_name, output_format)
+
+
+def convert_statement(account_type, path, output=None, output_format="csv"):
+    """
+    Converts a single statement and returns its status for the batch report.
+    Runs inside a worker process, so it must not raise.
+    """
+    output = output if output else default_output_file(path, output_format)
+    started = time.time()
+    try:
+        bank_account_adapter(account_type)(path, output)
+        status, error = "OK", ""
+    except Exception as exc:
+        status, error = "FAILED", f"{exc!r}\n{traceback.format_exc()}"
+    return {
+        "type": account_type,
+        "path": path,
+        "output": output,
+        "status": status,
+        "seconds": round(time.time() - started, 2),
+        "error": error,
+    }
+
+
+def read_batch_jobs(source):
+    """
+    Builds the list of (account type, path, output) jobs for the batch command.
+
+    source is either a manifest CSV with the columns type, path and an optional
+    output, or a directory holding one sub directory per account type named after
+    the Account enum (e.g. statements/HDFC_CREDIT_CARD/oct_2024.pdf).
+
+    Returns:
+    tuple: (jobs, skipped). skipped lists the (account type, path, reason) of the
+        files in the directory that are not converted.
+    """
+    account_types = {account.name for account in Account}
+    # Only the accounts with a statement adapter can be converted
+    convertible_types = {account.name for account in ADAPTERS}
+    jobs = []
+    skipped = []
+    if os.path.isdir(source):
+        for entry in sorted(os.listdir(source)):
+            account_type = entry.upper()
+            sub_dir = os.path.join(source, entry)
+            if account_type not in account_types or not os.path.isdir(sub_dir):
+                continue
+            if account_type not in convertible_types:
+                skipped.extend(
+                    (account_type, os.path.join(sub_dir, file_name), "No adapter for this account type")
+                    for file_name in sorted(os.listdir(sub_dir))
+                    if os.path.isfile(os.path.join(sub_dir, file_name))
+                )
+                continue
+            extensions = STATEMENT_EXTENSIONS.get(Account[account_type], DEFAULT_STATEMENT_EXTENSIONS)
+            for file_name in sorted(os.listdir(sub_dir)):
+                path = os.path.join(sub_dir, file_name)
+                if not os.path.isfile(path):
+                    continue
+                name, extension = os.path.splitext(file_name)
+                if name.endswith(("_output", "_modified", "_converted")):
+                    skipped.append((account_type, path, "Generated by a previous conversion"))
+                elif extension.lower() not in extensions:
+                    skipped.append((account_type, path, f"Not a {'/'.join(extensions)} statement"))
+                else:
+                    jobs.append((account_type, path, None))
+    else:
+        with open(source, "r") as fp:
+            for row in csv.DictReader(fp):
+                account_type = row["type"].strip().upper()
+                if account_type not in account_types:
+                    raise ValueError(f"Unknown account type '{row['type']}' in manifest {source}")
+                if account_type not in convertible_types:
+                    raise ValueError(f"No adapter for account type '{row['type']}' in manifest {source}")
+                jobs.append((account_type, row["path"].strip(), (row.get("output") or "").strip() or None))
+    return jobs, skipped
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="personal_finance_converter.py batch",
+        description="Converts many bank statements in parallel and writes a per file status report",
+    )
+    parser.add_argument(
+        "source",
+        help="Manifest CSV (type,path[,output]) or a directory with one sub directory per account type.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of worker processes. Defaults to the number of CPUs.",
+        dest="workers",
+        type=int,
+        default=os.cpu_count(),
+    )
+    parser.add_argument(
+        "-r",
+        "--report",
+        help="Path to the status report CSV. Defaults to batch_report.csv next to the source.",
+        dest="report",
+        required=False,
+    )
+    parser.add_argument(
+        "--debug-artifacts",
+        help="Keep the intermediate CSV files (raw PDF tables, _modified.csv) next to the statement.",
+        dest="debug_artifacts",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="Format of the default output files. Parquet needs pyarrow.",
+        dest="format",
+        choices=["csv", "parquet"],
+        default="csv",
+    )
+    args = parser.parse_args(argv)
+    if args.debug_artifacts:
+        os.environ["DEBUG_ARTIFACTS"] = "1"
+    from common import write_result
+
+    jobs, skipped = read_batch_jobs(args.source)
+    if not jobs and not skipped:
+        print(f"No statements found in {args.source}")
+        return
+    source_dir = args.source if os.path.isdir(args.source) else os.path.dirname(os.path.abspath(args.source))
+    report_file = args.report if args.report else os.path.join(source_dir, "batch_report.csv")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(convert_statement, *job, args.format) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"{result['status']} {result['type']} {result['path']} ({result['seconds']}s)")
+            results.append(result)
+
+    # Report in the order of the manifest, not in the order of completion
+    order = {(job[0], job[1]): index for index, job in enumerate(jobs)}
+    results.sort(key=lambda result: order[(result["type"], result["path"])])
+    for account_type, path, reason in skipped:
+        print(f"SKIPPED {account_type} {path} ({reason})")
+    results.extend(
+        {"type": account_type, "path": path, "output": "", "status": "SKIPPED", "seconds": 0, "error": reason}
+        for account_type, path, reason in skipped
+    )
+    write_result(report_file, results, headers=["type", "path", "output", "status", "seconds", "error"])
+    failed = sum(1 for result in results if result["status"] == "FAILED")
+    print(
+        f"Converted {len(jobs) - failed}/{len(jobs)} statements, skipped {len(skipped)} files. "
+        f"Report saved to {report_file}"
+    )
+
+
+def load_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="personal_finance_converter.py load",
+        description="Bulk loads converted statements (CSV or Parquet) into public.transactions. "
+        "Uses the DB_USER, DB_PASSWORD, DB_HOST, DB_PORT and DB_NAME env variables.",
+    )
+    parser.add_argument("paths", nargs="+", help="Converter output files to load.")
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        help="Number of rows sent per COPY.",
+        dest="batch_size",
+        type=int,
+        default=10000,
+    )
+    args = parser.parse_args(argv)
+    from common.db_loader import get_db_connection, load_transactions
+
+    conn = get_db_connection()
+    try:
+        staged, inserted = load_transactions(conn, args.paths, args.batch_size)
+    finally:
+        conn.close()
+    print(f"Loaded {staged} rows: {inserted} inserted, {staged - inserted} skipped as already present")
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "load":
+        load_main(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(
         prog="A program to convert bank statements to the preferred format",
         description="Takes the type of bank statement and outputs the converted format",
@@ -57,10 +263,26 @@ def main():
         dest="output",
         required=False,
     )
+    parser.add_argument(
+        "--debug-artifacts",
+        help="Keep the intermediate CSV files (raw PDF tables, _modified.csv) next to the statement.",
+        dest="debug_artifacts",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="Format of the default output file, ignored when --output is given (its extension decides). "
+        "Parquet needs pyarrow.",
+        dest="format",
+        choices=["csv", "parquet"],
+        default="csv",
+    )
     args = parser.parse_args()
-    temp_file_name, _ = os.path.splitext(args.path)
-    output_file = "%s_output.csv" % temp_file_name
-    bank_account_adapter(args.type)(args.path, args.output if args.output else output_file)
+    if args.debug_artifacts:
+        os.environ["DEBUG_ARTIFACTS"] = "1"
+    output = args.output if args.output else default_output_file(args.path, args.format)
+    bank_account_adapter(args.type)(args.path, output)
 
 
 if __name__ == "__main__":
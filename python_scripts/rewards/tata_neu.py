@@ -10,10 +10,15 @@ Usage:
 5. Fill it in the .env file as TATA_NEU_AUTHORIZATION_TOKEN, TATA_NEU_CLIENT_ID, TATA_NEU_CLIENT_SECRET
 
 """
+import argparse
+import json
 import os
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env
 load_dotenv()
@@ -24,12 +29,47 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 import psycopg2
-from psycopg2.extras import execute_batch
-
-def dump_to_database(entries: list[dict]):
+from psycopg2.extras import execute_values
+
+# Base URL of the ledger API, can be pointed at a local stub server for testing
+LEDGER_URL = os.getenv("TATA_NEU_LEDGER_URL", "https://api.tatadigital.com/api/v2/np/ledger/getCustomerLedgerInfo")
+# Number of ledger pages fetched in parallel
+FETCH_WORKERS = int(os.getenv("TATA_NEU_FETCH_WORKERS", 4))
+REQUEST_TIMEOUT = 30
+# Number of pages at the end of the ledger (the oldest entries) that are all saved and
+# the newest saved entry, lets an interrupted backfill resume. Counted from the end
+# because new entries are added at offset 0 and shift every offset. Kept next to this
+# module so the sync resumes whatever directory it is run from.
+CHECKPOINT_FILE = os.getenv(
+    "TATA_NEU_CHECKPOINT_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tata_neu_checkpoint.json"),
+)
+
+_session = None
+
+
+def get_session() -> requests.Session:
     """
-    Inserts a list of Tata Neu transaction entries into a PostgreSQL database table.
+    Returns the keep-alive session shared by all the page fetches. Requests failing
+    with 429 or 5xx are retried with exponential backoff, honouring Retry-After.
     """
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=max(FETCH_WORKERS, 10))
+        _session = requests.Session()
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def get_db_connection():
     # Load DB connection settings from environment variables
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -40,6 +80,27 @@ def dump_to_database(entries: list[dict]):
     if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
         raise EnvironmentError("Database environment variables are not properly set.")
 
+    return psycopg2.connect(
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME
+    )
+
+
+def dump_to_database(entries: list[dict], conn) -> int:
+    """
+    Inserts a list of Tata Neu transaction entries into a PostgreSQL database table
+    and commits them. Entries already in the table are skipped, which relies on the
+    tata_neu_transactions_unique constraint (sql/ddl.sql, added to an existing table
+    by sql/tata_neu_transactions_unique.sql).
+
+    Returns the number of entries inserted.
+    """
+    if not entries:
+        return 0
+
     # Define table name
     table_name = "tata_neu_transactions"
 
@@ -49,53 +110,50 @@ def dump_to_database(entries: list[dict]):
         transaction_type, created_at, points, points_category,
         program_name, transaction_id, transaction_number,
         txn_amount, txn_gross_amount, txn_date, store
-    ) VALUES (
+    ) VALUES %s
+    ON CONFLICT (transaction_id, transaction_type) DO NOTHING
+    RETURNING transaction_id;
+    """
+    template = """(
         %(transaction_type)s, %(created_at)s, %(points)s, %(points_category)s,
         %(program_name)s, %(transaction_id)s, %(transaction_number)s,
         %(txn_amount)s, %(txn_gross_amount)s, %(txn_date)s, %(store)s
-    );
-    """
+    )"""
 
-    conn = psycopg2.connect(
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME
-    )
     cursor = conn.cursor()
-
     try:
-        logger.info("Connecting to PostgreSQL database...")
-        logger.info(f"Inserting {len(entries)} records into '{table_name}'...")
-        sample_sql = cursor.mogrify(insert_query, entries[0])
-        logger.info(f"Sample SQL:\n{sample_sql.decode()}")
-        execute_batch(cursor, insert_query, entries)
+        inserted = execute_values(cursor, insert_query, entries, template=template, fetch=True)
         conn.commit()
-        logger.info("Data successfully inserted into the database.")
-
+        logger.info(f"Inserted {len(inserted)} of {len(entries)} entries into '{table_name}'.")
+        return len(inserted)
     except Exception:
-        if conn:
-            conn.rollback()
+        conn.rollback()
         raise
-
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-        logger.info("Database connection closed.")
+        cursor.close()
 
 
-def dump_to_database_batch(entries: list[dict]):
-    batch_size = 1
+def load_checkpoint() -> tuple:
+    """
+    Returns (pages_from_end, head): the number of pages at the end of the ledger whose
+    entries are all saved, and the (transaction_id, transaction_type) of the newest
+    saved entry. (0, None) when there is no checkpoint.
+    """
+    if not os.path.exists(CHECKPOINT_FILE):
+        return 0, None
+    with open(CHECKPOINT_FILE, "r") as f:
+        checkpoint = json.load(f)
+    head = checkpoint.get("head")
+    return checkpoint["pages_from_end"], tuple(head) if head else None
+
+
+def save_checkpoint(pages_from_end: int, head: tuple = None):
+    with open(CHECKPOINT_FILE, "w") as f:
+        json.dump({"pages_from_end": pages_from_end, "head": list(head) if head else None}, f)
 
-    logger.info(f"Processing {len(entries)} entries in batches of {batch_size}...")
 
-    for i in range(0, len(entries), batch_size):
-        batch = entries[i:i + batch_size]
-        logger.info(f"Processing batch {i // batch_size + 1} with {len(batch)} entries...")
-        dump_to_database(batch)
+def entry_key(entry: dict) -> tuple:
+    return entry['transaction_id'], entry['transaction_type']
 
 
 def fetch_ledger_page(offset: int) -> dict:
@@ -133,7 +191,7 @@ def fetch_ledger_page(offset: int) -> dict:
     }
 
     url = (
-        "https://api.tatadigital.com/api/v2/np/ledger/getCustomerLedgerInfo"
+        f"{LEDGER_URL}"
         "?excludeEvents=DelayedAccrual%2CCustomerRegistration%2CManualPointsConversion%2CCustomerImport"
         "&identifierName=externalId"
         "&source=INSTORE"
@@ -144,7 +202,7 @@ def fetch_ledger_page(offset: int) -> dict:
     )
 
     logger.info(f"Fetching ledger page with offset: {offset}")
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
     if response.status_code != 200:
         logger.error(f"Failed to fetch data. Status code: {response.status_code}")
@@ -162,7 +220,7 @@ def extract_entries(page_data: dict) -> list:
 
     for ledger in page_data.get('ledgerEntries', []):
         created_at = ledger.get('ledgerCreatedDate')
-        transaction_details = ledger.get('transactionDetails', {})
+        transaction_details = ledger.get('transactionDetails') or {}
         store = ledger.get('store')
 
         for detail in ledger.get('entryDetails', []):
@@ -171,13 +229,19 @@ def extract_entries(page_data: dict) -> list:
             if transaction_type == 'DEBIT':
                 points *= -1
 
+            # Entries without bill details (e.g. expiries) have no transaction id. A NULL
+            # never matches the unique constraint, so build a stable key for them instead.
+            transaction_id = transaction_details.get('transactionId')
+            if transaction_id is None:
+                transaction_id = f"ledger:{created_at}:{detail.get('pointsCategory')}:{detail.get('programName')}:{points}"
+
             entry = {
                 'transaction_type': transaction_type,
                 'created_at': created_at,
                 'points': points,
                 'points_category': detail.get('pointsCategory'),
                 'program_name': detail.get('programName'),
-                'transaction_id': transaction_details.get('transactionId'),
+                'transaction_id': transaction_id,
                 'transaction_number': transaction_details.get('transactionNumber'),
                 'txn_amount': float(transaction_details.get('amount')) if transaction_details.get('amount') else None,
                 'txn_gross_amount': float(transaction_details.get('grossBillAmount')) if transaction_details.get('grossBillAmount') else None,
@@ -189,32 +253,86 @@ def extract_entries(page_data: dict) -> list:
     return entries
 
 
-def process():
+def process(workers: int = FETCH_WORKERS, full: bool = False):
     """
-    Fetch all ledger pages, process them, and return a list of entries.
+    Fetch the ledger pages and save their entries to the database.
+
+    The ledger lists the newest entries first. Pages are read from offset 0 one at a
+    time until the page holding the newest entry saved by an earlier run (the head
+    in the checkpoint), or a page with no entry that isn't saved yet. This catches up
+    on everything added since the last sync however many pages it spans, and only
+    reads the pages that really are new.
+
+    The pages between that point and the checkpoint (the pages at the end of the
+    ledger saved by earlier runs) are then fetched by up to `workers` threads and
+    saved as they arrive. The checkpoint grows over the contiguous run of saved pages
+    at the end, so an interrupted backfill resumes where it stopped. Entries saved
+    before are skipped, which makes re-fetching a page harmless. With full set every
+    page is fetched.
     """
+    pages_from_end, head = (0, None) if full else load_checkpoint()
     first_page = fetch_ledger_page(offset=0)
     page_count = first_page.get('ledgerDetails', {}).get('pageCount', 1)
-    logger.info(f"Total page count: {page_count}")
+    logger.info(f"Total page count: {page_count}, pages saved from the end: {pages_from_end}")
 
-    # Process first page
+    conn = get_db_connection()
     try:
-        dump_to_database_batch(extract_entries(first_page))
-        # Process remaining pages
-        for offset in range(1, page_count):
+        # Catch up on the new entries at the head of the ledger, `offset` ends on the
+        # last page saved by this loop
+        offset = 0
+        page_data = first_page
+        new_head = None
+        while True:
+            entries = extract_entries(page_data)
+            inserted = dump_to_database(entries, conn)
+            if new_head is None and entries:
+                new_head = entry_key(entries[0])
+            if head is not None and head in map(entry_key, entries):
+                logger.info(f"Page {offset} holds the newest entry saved before, caught up on new entries")
+                break
+            if pages_from_end and entries and inserted == 0:
+                logger.info(f"Page {offset} was already saved, caught up on new entries")
+                break
+            if offset + 1 >= page_count or not (pages_from_end or head):
+                break
+            offset += 1
             page_data = fetch_ledger_page(offset=offset)
-            dump_to_database_batch(extract_entries(page_data))
-    except psycopg2.errors.UniqueViolation as ve:
-        logger.error(f"Constraint violation in batch {ve}")
-    except psycopg2.errors.IntegrityError as ie:
-        logger.error(f"Integrity error in batch {ie}")
-    except Exception as e:
-        logger.error(f"Unexpected error in batch {e}")
+        # Everything from offset 0 to the previous head is saved now
+        head = new_head or head
+
+        # New entries shift the page boundaries, so re-fetch the newest checkpointed page
+        backfill_end = min(page_count, page_count - pages_from_end + 1)
+        pages_from_end = min(pages_from_end, page_count - backfill_end)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Oldest pages first, the checkpoint only grows from the end of the ledger
+            futures = {
+                executor.submit(fetch_ledger_page, page_offset): page_offset
+                for page_offset in range(backfill_end - 1, offset, -1)
+            }
+            saved = set()
+            try:
+                for future in as_completed(futures):
+                    dump_to_database(extract_entries(future.result()), conn)
+                    saved.add(futures[future])
+                    while page_count - pages_from_end - 1 in saved:
+                        pages_from_end += 1
+                    save_checkpoint(pages_from_end, head)
+            except Exception:
+                # Don't fetch the pages still queued once the sync has failed
+                executor.shutdown(cancel_futures=True)
+                raise
+        save_checkpoint(page_count, head)
+    finally:
+        conn.close()
+    logger.info(f"Synced all {page_count} pages")
 
 
-# Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync Tata Neu rewards ledger to the database")
+    parser.add_argument("--full", action="store_true", help="Fetch every page, ignoring the saved checkpoint")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="Number of pages fetched in parallel")
+    args = parser.parse_args()
     try:
-        process()
+        process(args.workers, args.full)
     except Exception as e:
-        logger.error(f"Failed to complete processing: {e}")
+        logger.exception(f"Failed to complete processing: {e}")
@@ -10,6 +10,7 @@ import argparse
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from typing import List, Dict
 
@@ -39,6 +40,7 @@ from stocks.consolidated_view.file_utils import (
     process_mutual_fund_holdings_file
 )
 from stocks.consolidated_view.groww_api import get_mf_stock_holdings
+from stocks.consolidated_view.groww_cache import get_groww_cache
 from stocks.consolidated_view import zerodha_handler
 
 
@@ -120,29 +122,55 @@ def process_mutual_fund_holdings(file_path: str, conn) -> List[Dict]:
     return records
 
 
-def process_mutual_fund_stocks(mf_records: List[Dict], conn) -> List[Dict]:
+# Number of mutual funds looked up on Groww in parallel
+GROWW_WORKERS = 8
+
+
+def fetch_mf_stock_holdings(mf_names: List[str], workers: int = GROWW_WORKERS) -> List[List[Dict]]:
+    """
+    Fetch the stock holdings of several mutual funds concurrently.
+    
+    Args:
+        mf_names: Names of the mutual funds
+        workers: Maximum number of funds looked up at the same time
+        
+    Returns:
+        Holdings of each fund, in the order of mf_names
+    """
+    if not mf_names:
+        return []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        all_holdings = list(executor.map(get_mf_stock_holdings, mf_names))
+    cache = get_groww_cache()
+    if cache is not None:
+        cache.log_stats()
+    return all_holdings
+
+
+def process_mutual_fund_stocks(mf_records: List[Dict], conn, workers: int = GROWW_WORKERS) -> List[Dict]:
     """
     Process mutual funds to extract stock holdings via Groww API.
     
     Args:
         mf_records: List of mutual fund records from the holdings file
         conn: Database connection
+        workers: Maximum number of funds looked up on Groww at the same time
         
     Returns:
         List of dictionaries with mutual fund stock details
     """
     all_stock_details = []
     
-    for mf_record in mf_records:
-        mf_name = mf_record.get("Scheme Name", "")
-        if not mf_name:
-            continue
+    mf_records = [mf_record for mf_record in mf_records if mf_record.get("Scheme Name", "")]
+    
+    # Get stock holdings from Groww API
+    all_holdings = fetch_mf_stock_holdings([mf_record["Scheme Name"] for mf_record in mf_records], workers)
+    
+    for mf_record, holdings in zip(mf_records, all_holdings):
+        mf_name = mf_record["Scheme Name"]
         
         logger.info(f"Processing MF: {mf_name}")
         
-        # Get stock holdings from Groww API
-        holdings = get_mf_stock_holdings(mf_name)
-        
         if not holdings:
             logger.warning(f"No holdings found for {mf_name}")
             continue
@@ -215,6 +243,12 @@ def main():
         required=True,
         help="Path to stock holdings statement file (CSV or Excel)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=GROWW_WORKERS,
+        help=f"Number of mutual funds looked up on Groww in parallel (default: {GROWW_WORKERS})"
+    )
     
     args = parser.parse_args()
     
@@ -245,7 +279,7 @@ def main():
         logger.info("=" * 60)
         logger.info("Processing Mutual Fund Stock Holdings via Groww API...")
         logger.info("=" * 60)
-        mf_stock_details = process_mutual_fund_stocks(mf_records, conn)
+        mf_stock_details = process_mutual_fund_stocks(mf_records, conn, args.workers)
         
         # Commit all transactions
         conn.commit()
@@ -8,7 +8,10 @@ import sys
 import os
 import logging
 import re
+import threading
+import time
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 
 # Add python_scripts to path for imports
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,10 +19,68 @@ python_scripts_dir = os.path.dirname(os.path.dirname(script_dir))
 if python_scripts_dir not in sys.path:
     sys.path.insert(0, python_scripts_dir)
 
+from stocks.consolidated_view.groww_cache import get_groww_cache
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+# Maximum number of requests per second sent to each Groww host
+REQUESTS_PER_SECOND = float(os.getenv("GROWW_REQUESTS_PER_SECOND", 5))
+
+
+class RateLimiter:
+    """
+    Spaces out requests to the same host by at least 1 / rate seconds, across threads.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, url: str):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the keep-alive session shared by all the Groww API calls.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_maxsize=32))
+    return _session
+
+
+def _get(url: str, headers: Dict) -> requests.Response:
+    _rate_limiter.wait(url)
+    return get_session().get(url, headers=headers, timeout=10)
+
+
+class GrowwTransientError(Exception):
+    """
+    A Groww request failed for a reason that may go away on a later run (timeout,
+    connection error, 429 or 5xx), as opposed to the fund not being found.
+    """
+
+
+def _is_transient(error: requests.RequestException) -> bool:
+    response = error.response
+    return response is None or response.status_code == 429 or response.status_code >= 500
+
 
 def _clean_mf_name_for_search(mf_name: str) -> str:
     """
@@ -61,6 +122,9 @@ def get_mf_search_id_api(mf_name: str) -> Optional[str]:
         
     Returns:
         search_id if found, None otherwise
+
+    Raises:
+        GrowwTransientError: The search request failed transiently
     """
     # Clean the query
     cleaned_query = _clean_mf_name_for_search(mf_name)
@@ -81,7 +145,7 @@ def get_mf_search_id_api(mf_name: str) -> Optional[str]:
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _get(url, headers)
         response.raise_for_status()
         
         data = response.json()
@@ -115,6 +179,8 @@ def get_mf_search_id_api(mf_name: str) -> Optional[str]:
             f"mf_name={mf_name} | "
             f"error={e}"
         )
+        if _is_transient(e):
+            raise GrowwTransientError(f"API search failed for {mf_name}") from e
         return None
 
 
@@ -163,7 +229,10 @@ def get_mf_search_id(mf_name: str) -> str:
         search_id string
     """
     # Try API first
-    search_id = get_mf_search_id_api(mf_name)
+    try:
+        search_id = get_mf_search_id_api(mf_name)
+    except GrowwTransientError:
+        search_id = None
     if search_id:
         return search_id
     
@@ -174,14 +243,24 @@ def get_mf_search_id(mf_name: str) -> str:
 
 def _fetch_mf_details(search_id: str) -> Optional[Dict]:
     """
-    Fetch mutual fund details from API.
+    Fetch mutual fund details from API, or from the local cache when fetched recently.
     
     Args:
         search_id: The search_id for the API
         
     Returns:
         Dictionary with MF details including holdings, or None if failed
+
+    Raises:
+        GrowwTransientError: The request failed transiently, None means the scheme was not found
     """
+    cache = get_groww_cache()
+    if cache is not None:
+        cached = cache.get_details(search_id)
+        if cached is not None:
+            logger.info(f"[CACHE] Using cached MF details | search_id={search_id}")
+            return cached
+    
     url = f"https://groww.in/v1/api/data/mf/web/v4/scheme/search/{search_id}"
     
     headers = {
@@ -196,10 +275,12 @@ def _fetch_mf_details(search_id: str) -> Optional[Dict]:
     
     response = None
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _get(url, headers)
         response.raise_for_status()
         result = response.json()
         logger.info(f"[FETCH] Successfully fetched MF details | search_id={search_id}")
+        if cache is not None:
+            cache.put_details(search_id, result)
         return result
     except requests.RequestException as e:
         response_status = response.status_code if response is not None else None
@@ -212,13 +293,27 @@ def _fetch_mf_details(search_id: str) -> Optional[Dict]:
             f"response_body={response_body} | "
             f"error={e}"
         )
+        if _is_transient(e):
+            raise GrowwTransientError(f"Failed to fetch MF details for {search_id}") from e
         return None
 
 
+def _remember_search_id(mf_name: str, search_id: str, strategy: str):
+    cache = get_groww_cache()
+    if cache is not None:
+        cache.put_search_id(mf_name, search_id, strategy)
+
+
 def get_mf_details(mf_name: str) -> Optional[Dict]:
     """
     Get mutual fund details. Tries API search_id first, falls back to string transformation.
     
+    With the local cache enabled, the search_id that worked last time is tried first
+    so a known fund costs at most one request, and funds for which every method failed
+    are skipped until GROWW_FAILED_RETRY_DAYS have passed. A fund is only remembered
+    as failed when Groww said it doesn't know it, not when a request timed out or
+    was rejected with a 429 or 5xx.
+    
     Args:
         mf_name: Name of the mutual fund
         
@@ -226,15 +321,48 @@ def get_mf_details(mf_name: str) -> Optional[Dict]:
         Dictionary with MF details including holdings, or None if all methods fail
     """
     logger.info(f"[START] Getting MF details | mf_name={mf_name}")
+    cache = get_groww_cache()
+    transient_failure = False
+
+    def fetch_details(search_id: str) -> Optional[Dict]:
+        nonlocal transient_failure
+        try:
+            return _fetch_mf_details(search_id)
+        except GrowwTransientError:
+            transient_failure = True
+            return None
+    
+    # Skip funds no strategy could resolve recently
+    if cache is not None and cache.recently_failed(mf_name):
+        logger.warning(f"[SKIPPED] All methods failed recently, not retrying yet | mf_name={mf_name}")
+        return None
+    
+    # Step 0: go straight to the search_id of the strategy that worked on a previous run
+    cached = cache.get_search_id(mf_name) if cache is not None else None
+    if cached:
+        cached_search_id, strategy = cached
+        logger.info(
+            f"[STEP 0] Using cached search_id | mf_name={mf_name} | search_id={cached_search_id} | strategy={strategy}"
+        )
+        result = fetch_details(cached_search_id)
+        if result:
+            logger.info(f"[SUCCESS] Got MF details via cached search_id | mf_name={mf_name}")
+            return result
+        logger.info(f"[STEP 0] Cached search_id failed, trying every method again | mf_name={mf_name}")
     
     # Step 1: Try with API search_id first
     logger.info(f"[STEP 1] Trying API method first | mf_name={mf_name}")
-    api_search_id = get_mf_search_id_api(mf_name)
+    try:
+        api_search_id = get_mf_search_id_api(mf_name)
+    except GrowwTransientError:
+        transient_failure = True
+        api_search_id = None
     if api_search_id:
         logger.info(f"[STEP 1] API search_id found | mf_name={mf_name} | api_search_id={api_search_id}")
-        result = _fetch_mf_details(api_search_id)
+        result = fetch_details(api_search_id)
         if result:
             logger.info(f"[SUCCESS] Got MF details via API method | mf_name={mf_name}")
+            _remember_search_id(mf_name, api_search_id, "api")
             return result
         logger.info(f"[STEP 1] API method failed to fetch details, will try fallback | mf_name={mf_name}")
     else:
@@ -244,22 +372,28 @@ def get_mf_details(mf_name: str) -> Optional[Dict]:
     logger.info(f"[STEP 2] Trying fallback method (with plan removed) | mf_name={mf_name}")
     fallback_search_id = get_mf_search_id_fallback(mf_name, remove_plan=True)
     
-    result = _fetch_mf_details(fallback_search_id)
+    result = fetch_details(fallback_search_id)
     if result:
         logger.info(f"[SUCCESS] Got MF details via fallback method (plan removed) | mf_name={mf_name}")
+        _remember_search_id(mf_name, fallback_search_id, "fallback_plan_removed")
         return result
     
     # Step 3: Fallback without removing "plan"
     logger.info(f"[STEP 3] Trying fallback method (with plan kept) | mf_name={mf_name}")
     fallback_search_id_with_plan = get_mf_search_id_fallback(mf_name, remove_plan=False)
     
-    result = _fetch_mf_details(fallback_search_id_with_plan)
+    result = fetch_details(fallback_search_id_with_plan)
     if result:
         logger.info(f"[SUCCESS] Got MF details via fallback method (plan kept) | mf_name={mf_name}")
+        _remember_search_id(mf_name, fallback_search_id_with_plan, "fallback_plan_kept")
         return result
     
     # All methods failed - log error and return None to continue with next MF
     logger.error(f"[FAILED] All methods failed (API, fallback with plan removed, fallback with plan kept) | mf_name={mf_name}")
+    if transient_failure:
+        logger.warning(f"[FAILED] Some requests failed transiently, not remembering the fund as failed | mf_name={mf_name}")
+    elif cache is not None:
+        cache.put_failed(mf_name)
     return None
 
 
@@ -0,0 +1,165 @@
+"""
+Local SQLite cache for Groww mutual fund lookups.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+GROWW_CACHE_FILE = "cache/groww_cache.sqlite3"
+# Holdings are published at most monthly, a week old scheme is fresh enough
+GROWW_DETAILS_TTL_DAYS = 7
+# Funds that no search strategy resolved are not looked up again for this long
+GROWW_FAILED_RETRY_DAYS = 7
+
+logger = logging.getLogger(__name__)
+
+
+class GrowwCache:
+    """
+    Caches mutual fund name -> (strategy, search_id) (never expires) and search_id ->
+    scheme details JSON (expires after details_ttl seconds) in a SQLite file. Funds
+    that no strategy resolved are remembered too, for failed_retry seconds.
+
+    The same instance is used from the enrichment worker threads, so every access
+    goes through a lock.
+    """
+
+    def __init__(
+        self,
+        cache_file: str = GROWW_CACHE_FILE,
+        details_ttl: float = GROWW_DETAILS_TTL_DAYS * 86400,
+        failed_retry: float = GROWW_FAILED_RETRY_DAYS * 86400,
+    ):
+        self.cache_file = cache_file
+        self.details_ttl = details_ttl
+        self.failed_retry = failed_retry
+        self.hits = {"search_id": 0, "details": 0, "failed": 0}
+        self.misses = {"search_id": 0, "details": 0, "failed": 0}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(cache_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_ids ("
+            "mf_name TEXT PRIMARY KEY, search_id TEXT NOT NULL, updated_at REAL NOT NULL, strategy TEXT)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(search_ids)")]
+        if "strategy" not in columns:
+            self._conn.execute("ALTER TABLE search_ids ADD COLUMN strategy TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS failed_lookups (mf_name TEXT PRIMARY KEY, failed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheme_details (search_id TEXT PRIMARY KEY, details TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        atexit.register(self.close)
+
+    def _count(self, kind: str, found: bool):
+        if found:
+            self.hits[kind] += 1
+        else:
+            self.misses[kind] += 1
+
+    def get_search_id(self, mf_name: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Returns (search_id, strategy) that resolved the fund last time, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT search_id, strategy FROM search_ids WHERE mf_name = ?", (mf_name,)
+            ).fetchone()
+            self._count("search_id", row is not None)
+        return (row[0], row[1]) if row else None
+
+    def put_search_id(self, mf_name: str, search_id: str, strategy: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_ids (mf_name, search_id, updated_at, strategy) VALUES (?, ?, ?, ?)",
+                (mf_name, search_id, time.time(), strategy),
+            )
+            self._conn.execute("DELETE FROM failed_lookups WHERE mf_name = ?", (mf_name,))
+            self._conn.commit()
+
+    def recently_failed(self, mf_name: str) -> bool:
+        """
+        Returns True when every strategy failed for the fund less than failed_retry seconds ago.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM failed_lookups WHERE mf_name = ? AND failed_at >= ?",
+                (mf_name, time.time() - self.failed_retry),
+            ).fetchone()
+            self._count("failed", row is not None)
+        return row is not None
+
+    def put_failed(self, mf_name: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO failed_lookups VALUES (?, ?)", (mf_name, time.time()))
+            self._conn.commit()
+
+    def get_details(self, search_id: str) -> Optional[Dict]:
+        """
+        Returns the cached scheme details, None when missing or older than details_ttl.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details FROM scheme_details WHERE search_id = ? AND fetched_at >= ?",
+                (search_id, time.time() - self.details_ttl),
+            ).fetchone()
+            self._count("details", row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put_details(self, search_id: str, details: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scheme_details VALUES (?, ?, ?)", (search_id, json.dumps(details), time.time())
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        return {
+            kind: {"hits": self.hits[kind], "misses": self.misses[kind]}
+            for kind in self.hits
+        }
+
+    def log_stats(self):
+        logger.info(f"Groww cache stats: {self.stats()}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            self._conn = None
+
+
+_groww_cache: Optional[GrowwCache] = None
+_groww_cache_lock = threading.Lock()
+
+
+def get_groww_cache() -> Optional[GrowwCache]:
+    """
+    Returns the process wide GrowwCache stored in the file named by the
+    GROWW_CACHE_FILE env variable (cache/groww_cache.sqlite3 by default), or None
+    when it is set to an empty value. GROWW_DETAILS_TTL_DAYS sets how long the
+    scheme details are reused and GROWW_FAILED_RETRY_DAYS how long a fund that
+    could not be resolved is skipped.
+    """
+    global _groww_cache
+    cache_file = os.getenv("GROWW_CACHE_FILE", GROWW_CACHE_FILE)
+    if not cache_file:
+        return None
+    with _groww_cache_lock:
+        if _groww_cache is None:
+            ttl_days = float(os.getenv("GROWW_DETAILS_TTL_DAYS", GROWW_DETAILS_TTL_DAYS))
+            retry_days = float(os.getenv("GROWW_FAILED_RETRY_DAYS", GROWW_FAILED_RETRY_DAYS))
+            _groww_cache = GrowwCache(cache_file, details_ttl=ttl_days * 86400, failed_retry=retry_days * 86400)
+    return _groww_cache
@@ -1,8 +1,16 @@
 import psycopg2
 import os
 import argparse
+import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, date
-from typing import List, Tuple
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from common.min_cost_flow import MinCostFlow
 
 # Environment variables
 DB_USER = os.getenv("DB_USER")
@@ -18,63 +26,60 @@ def get_db_connection():
     )
 
 
-def check_existing_tags(
-    conn, atm_id: int, atm_amount: float, tolerance: float
-) -> Tuple[bool, float]:
-    """
-    Check if transactions already tagged with this ATM ID sum within tolerance.
-    Returns (already_sufficient: bool, current_sum: float)
-    """
-    query = f"""
-        SELECT COALESCE(SUM(txn_amount), 0) as tagged_sum
-        FROM transactions 
-        WHERE tags LIKE '%#{atm_id}#%' 
-          AND account = 'Cash' 
-          AND txn_type = 'Debit';
-    """
-    with conn.cursor() as cur:
-        cur.execute(query)
-        result = cur.fetchone()
-        tagged_sum = result[0] if result else 0.0
-
-    shortfall = atm_amount - tagged_sum
-    already_sufficient = shortfall <= tolerance
-
-    return already_sufficient, tagged_sum
-
-
 def fetch_atm_withdrawals(
     conn, from_date: str, to_date: str
 ) -> List[Tuple[int, date, float]]:
-    query = f"""
+    query = """
         SELECT id, txn_date, txn_amount 
         FROM transactions 
-        WHERE txn_date BETWEEN '{from_date}' AND '{to_date}' 
+        WHERE txn_date BETWEEN %s AND %s 
           AND category = 'ATM Withdrawal'
         ORDER BY txn_date, id;
     """
     with conn.cursor() as cur:
-        cur.execute(query)
+        cur.execute(query, (from_date, to_date))
         return [(row[0], row[1], row[2]) for row in cur.fetchall()]
 
 
+def fetch_existing_tag_sums(conn, atm_ids: List[int]) -> Dict[int, float]:
+    """
+    Sums the cash debits already tagged with each ATM ID in one query.
+    Returns {atm_id: tagged_sum}, ATMs without tagged debits are left out.
+    """
+    # Tags are matched as text against the ATM IDs, casting them to int would fail the
+    # whole query on a longer run of digits such as a phone number (#9876543210#)
+    query = """
+        SELECT atm.id AS atm_id, SUM(t.txn_amount) AS tagged_sum
+        FROM transactions t
+        CROSS JOIN LATERAL regexp_matches(t.tags, '#([0-9]+)#', 'g') AS m
+        JOIN unnest(%s::int[]) AS atm(id) ON atm.id::text = m[1]
+        WHERE t.account = 'Cash'
+          AND t.txn_type = 'Debit'
+        GROUP BY 1;
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (list(atm_ids),))
+        return {row[0]: row[1] for row in cur.fetchall()}
+
+
 def fetch_cash_debits(
-    conn, start_date: date, from_date: str, to_date: str
+    conn, from_date: str, to_date: str
 ) -> List[Tuple[int, date, float]]:
-    date_str = start_date.strftime("%Y-%m-%d")
-    query = f"""
+    """
+    Fetches every untagged cash debit in the date range, ordered by date.
+    """
+    query = """
         SELECT id, txn_date, txn_amount 
         FROM transactions 
-        WHERE txn_date >= '{date_str}' 
-          AND txn_date BETWEEN '{from_date}' AND '{to_date}'
+        WHERE txn_date BETWEEN %s AND %s
           AND account = 'Cash' 
           AND txn_type = 'Debit' 
           AND category != 'Others'
-          AND (tags IS NULL OR tags = '' OR tags NOT LIKE '%#%%#')
+          AND (tags IS NULL OR tags = '' OR tags NOT LIKE '%%#%%#')
         ORDER BY txn_date, id;
     """
     with conn.cursor() as cur:
-        cur.execute(query)
+        cur.execute(query, (from_date, to_date))
         return [(row[0], row[1], row[2]) for row in cur.fetchall()]
 
 
@@ -103,14 +108,317 @@ def find_matching_transactions(
     return []
 
 
-def generate_update_queries(
-    atm_id: int, matching_ids: List[int], atm_amount: float, matched_sum: float
-) -> str:
-    ids_str = ", ".join(map(str, matching_ids))
-    shortfall = atm_amount - matched_sum
-    return f"""-- ATM #{atm_id}# (₹{atm_amount:.0f}) → ₹{matched_sum:.0f} (shortfall: ₹{shortfall:.0f})
-UPDATE transactions SET tags = COALESCE(tags, '') || '#{atm_id}#' 
-WHERE id IN ({ids_str});"""
+def find_closest_subset(
+    atm_amount: float,
+    cash_transactions: List[Tuple[int, date, float]],
+    tolerance: float = 100.0,
+    time_budget: float = 1.0,
+    max_candidates: int = 1000,
+) -> Optional[List[int]]:
+    """
+    Exact match: the subset of cash transactions whose sum is closest to atm_amount
+    without going over atm_amount + tolerance.
+
+    Subset sum DP over the amounts rounded to the rupee, one NumPy pass per cash
+    transaction over the reachable sums. A subset whose real sum goes over the limit
+    is never returned. Returns None when the candidates are more
+    than max_candidates or the DP runs past time_budget seconds, so the caller can
+    fall back to the greedy match.
+    """
+    candidates = [t for t in cash_transactions if round(t[2]) > 0]
+    if len(candidates) > max_candidates:
+        return None
+    amounts = [int(round(t[2])) for t in candidates]
+    limit = int(np.floor(atm_amount + tolerance))
+    if limit <= 0:
+        return []
+
+    deadline = time.monotonic() + time_budget
+    reachable = np.zeros(limit + 1, dtype=bool)
+    reachable[0] = True
+    # parent[s] = index of the transaction that first made the sum s reachable
+    parent = np.full(limit + 1, -1, dtype=np.int32)
+    for index, amount in enumerate(amounts):
+        if amount > limit:
+            continue
+        new_sums = np.zeros(limit + 1, dtype=bool)
+        new_sums[amount:] = reachable[:-amount] & ~reachable[amount:]
+        parent[new_sums] = index
+        reachable |= new_sums
+        if time.monotonic() > deadline:
+            return None
+
+    # The DP bounds the rounded sums, so the real sum of the closest one can still go
+    # over atm_amount + tolerance (2 x 500.4 for 1000). Try the next closest sums then.
+    sums = np.flatnonzero(reachable)
+    for best in sums[np.argsort(np.abs(sums - atm_amount), kind="stable")]:
+        best = int(best)
+        matching_ids = []
+        total = 0.0
+        while best > 0:
+            index = parent[best]
+            matching_ids.append(candidates[index][0])
+            total += candidates[index][2]
+            best -= amounts[index]
+        if total <= atm_amount + tolerance:
+            return matching_ids
+        if time.monotonic() > deadline:
+            return None
+    return []
+
+
+def find_exact_matching_transactions(
+    atm_amount: float,
+    cash_transactions: List[Tuple[int, date, float]],
+    tolerance: float = 100.0,
+    time_budget: float = 1.0,
+    max_candidates: int = 1000,
+) -> List[int]:
+    """
+    find_closest_subset, falling back to the greedy find_matching_transactions when
+    it is over budget. The closer of the two results is returned.
+    """
+    greedy_ids = find_matching_transactions(atm_amount, cash_transactions, tolerance)
+    exact_ids = find_closest_subset(atm_amount, cash_transactions, tolerance, time_budget, max_candidates)
+    if exact_ids is None:
+        print(f"   ⏱️  Exact match over budget, using greedy")
+        return greedy_ids
+
+    amounts = {t[0]: t[2] for t in cash_transactions}
+
+    def distance(ids):
+        return abs(atm_amount - sum(amounts[tid] for tid in ids))
+
+    # Rounding to the rupee can make the DP pick a marginally worse subset
+    if greedy_ids and distance(greedy_ids) < distance(exact_ids):
+        return greedy_ids
+    return exact_ids
+
+
+def match_atm_withdrawals(
+    atm_withdrawals: List[Tuple[int, date, float]],
+    tagged_sums: Dict[int, float],
+    cash_debits: List[Tuple[int, date, float]],
+    tolerance: float = 100.0,
+    matcher: Callable[..., List[int]] = find_matching_transactions,
+) -> Tuple[List[Tuple[int, float, List[int], float]], int]:
+    """
+    Matches the ATM withdrawals to cash debits in memory, in date order.
+
+    Each ATM only considers the cash debits on or after its date which no earlier
+    ATM has claimed. ATMs whose already tagged sum is within tolerance are skipped.
+    matcher picks the cash debits for one ATM, see find_matching_transactions.
+
+    Returns ([(atm_id, atm_amount, matching_ids, total_sum)], skipped_already_tagged)
+    """
+    cash_debits = sorted(cash_debits, key=lambda t: (t[1], t[0]))
+    cash_dates = [t[1] for t in cash_debits]
+    used_cash_ids = set()
+    matches = []
+    skipped_already_tagged = 0
+
+    for atm_id, atm_date, atm_amount in atm_withdrawals:
+        print(f"\n🔍 ATM #{atm_id} ({atm_date}): ₹{atm_amount:.0f}")
+
+        tagged_sum = tagged_sums.get(atm_id, 0.0)
+        if atm_amount - tagged_sum <= tolerance:
+            print(
+                f"   ⏭️  SKIPPED: Already tagged sum ₹{tagged_sum:.0f} within tolerance"
+            )
+            skipped_already_tagged += 1
+            continue
+
+        print(
+            f"   📊 Existing tagged sum: ₹{tagged_sum:.0f} (needs ₹{atm_amount-tagged_sum:.0f} more)"
+        )
+
+        # Untagged cash debits from the ATM date on, not claimed by another ATM
+        candidates = [
+            t for t in cash_debits[bisect_left(cash_dates, atm_date):] if t[0] not in used_cash_ids
+        ]
+        print(
+            f"   📈 {len(candidates)} untagged cash debits available (after excluding already used)"
+        )
+
+        matching_ids = matcher(atm_amount - tagged_sum, candidates, tolerance)
+
+        if matching_ids:
+            # Mark these cash txns as used so they aren't reused for another ATM
+            used_cash_ids.update(matching_ids)
+
+            matched_ids = set(matching_ids)
+            matched_sum = sum(t[2] for t in candidates if t[0] in matched_ids)
+            total_sum = tagged_sum + matched_sum
+            matches.append((atm_id, atm_amount, matching_ids, total_sum))
+            print(
+                f"   ✅ Matched {len(matching_ids)} NEW txns (total: ₹{total_sum:.0f})"
+            )
+        else:
+            print(f"   ❌ No additional match found")
+
+    return matches, skipped_already_tagged
+
+
+def solve_global_assignment(
+    atm_withdrawals: List[Tuple[int, date, float]],
+    tagged_sums: Dict[int, float],
+    cash_debits: List[Tuple[int, date, float]],
+    tolerance: float = 100.0,
+    window: int = 3,
+    time_budget: float = 30.0,
+    subset_time_budget: float = 1.0,
+) -> Tuple[List[Tuple[int, float, List[int], float]], int, Dict[int, float]]:
+    """
+    Assigns cash debits to all the ATM withdrawals together instead of letting the
+    earlier ATMs claim debits first.
+
+    1. Min cost flow: source -> cash debit (its amount) -> ATM (cost = days between
+       the withdrawal and the debit) -> sink (the amount still untagged). A debit can
+       only go to the `window` most recent ATMs on or before its date. The flow covers
+       as much of the ATM amounts as possible, preferring the nearest withdrawal.
+    2. Each debit goes to the ATM that got the largest share of its flow.
+    3. ATMs that end up over amount + tolerance keep their closest subset
+       (find_exact_matching_transactions); the released debits and the debits that
+       got no flow are then used to top up the ATMs still short, in date order.
+
+    time_budget bounds the flow solver in seconds, when it runs out the flow found so
+    far is used. subset_time_budget is the per ATM budget of the exact subset match.
+
+    Returns (matches, skipped_already_tagged, shortfalls) where matches is in the
+    format of match_atm_withdrawals and shortfalls maps each ATM to its remaining
+    untagged amount.
+    """
+    pending = []
+    shortfalls = {}
+    for atm_id, atm_date, atm_amount in sorted(atm_withdrawals, key=lambda atm: (atm[1], atm[0])):
+        tagged_sum = tagged_sums.get(atm_id, 0.0)
+        if atm_amount - tagged_sum <= tolerance:
+            shortfalls[atm_id] = atm_amount - tagged_sum
+            continue
+        pending.append((atm_id, atm_date, atm_amount, tagged_sum))
+    skipped_already_tagged = len(atm_withdrawals) - len(pending)
+    if not pending:
+        return [], skipped_already_tagged, shortfalls
+
+    atm_dates = [atm[1] for atm in pending]
+
+    def eligible_atms(cash_date: date) -> range:
+        latest = bisect_right(atm_dates, cash_date)
+        return range(max(0, latest - window), latest)
+
+    # Nodes: 0 source, 1 sink, 2 .. 2 + len(cash_debits) cash debits, then the ATMs
+    source, sink = 0, 1
+    atm_node = 2 + len(cash_debits)
+    graph = MinCostFlow(atm_node + len(pending))
+    cash_edges = []
+    for cash_index, (cash_id, cash_date, cash_amount) in enumerate(cash_debits):
+        amount = int(round(cash_amount))
+        edges = []
+        if amount > 0:
+            graph.add_edge(source, 2 + cash_index, amount, 0)
+            for atm_index in eligible_atms(cash_date):
+                gap = (cash_date - atm_dates[atm_index]).days
+                edges.append((atm_index, graph.add_edge(2 + cash_index, atm_node + atm_index, amount, gap)))
+        cash_edges.append(edges)
+    for atm_index, (_, _, atm_amount, tagged_sum) in enumerate(pending):
+        graph.add_edge(atm_node + atm_index, sink, int(round(atm_amount - tagged_sum)), 0)
+
+    started = time.monotonic()
+    flow, cost, completed = graph.solve(source, sink, deadline=started + time_budget)
+    print(
+        f"🧮 Min cost flow: ₹{flow} assigned in {time.monotonic() - started:.1f}s"
+        + ("" if completed else " (time budget reached, using the partial flow)")
+    )
+
+    # Round the flow: every debit goes to the ATM with the largest share of it
+    assigned = [[] for _ in pending]
+    pool = []
+    for cash, edges in zip(cash_debits, cash_edges):
+        flows = [(graph.flow(edge_id), atm_index) for atm_index, edge_id in edges]
+        best_flow, best_atm = max(flows, default=(0, None))
+        if best_flow > 0:
+            assigned[best_atm].append(cash)
+        elif edges:
+            pool.append(cash)
+
+    # Trim the ATMs that went over amount + tolerance
+    for atm_index, (_, _, atm_amount, tagged_sum) in enumerate(pending):
+        rows = assigned[atm_index]
+        need = atm_amount - tagged_sum
+        if sum(t[2] for t in rows) > need + tolerance:
+            kept = set(find_exact_matching_transactions(need, rows, tolerance, subset_time_budget))
+            pool.extend(t for t in rows if t[0] not in kept)
+            assigned[atm_index] = [t for t in rows if t[0] in kept]
+
+    # Top up the ATMs still short from the debits nobody kept
+    for atm_index, (_, atm_date, atm_amount, tagged_sum) in enumerate(pending):
+        remaining = atm_amount - tagged_sum - sum(t[2] for t in assigned[atm_index])
+        if remaining <= tolerance or not pool:
+            continue
+        candidates = [t for t in pool if atm_index in eligible_atms(t[1])]
+        extra = set(find_exact_matching_transactions(remaining, candidates, tolerance, subset_time_budget))
+        if extra:
+            assigned[atm_index].extend(t for t in candidates if t[0] in extra)
+            pool = [t for t in pool if t[0] not in extra]
+
+    matches = []
+    for atm_index, (atm_id, atm_date, atm_amount, tagged_sum) in enumerate(pending):
+        rows = assigned[atm_index]
+        total_sum = tagged_sum + sum(t[2] for t in rows)
+        shortfalls[atm_id] = atm_amount - total_sum
+        status = "✅" if abs(atm_amount - total_sum) <= tolerance else "⚠️ "
+        print(
+            f"{status} ATM #{atm_id} ({atm_date}): ₹{atm_amount:.0f} → ₹{total_sum:.0f} "
+            f"with {len(rows)} NEW txns (shortfall: ₹{atm_amount - total_sum:.0f})"
+        )
+        if rows:
+            matches.append((atm_id, atm_amount, [t[0] for t in rows], total_sum))
+    return matches, skipped_already_tagged, shortfalls
+
+
+def update_values(matches: List[Tuple[int, float, List[int], float]]) -> List[Tuple[int, str]]:
+    """(cash txn id, tag to append) for every matched cash debit."""
+    return [
+        (cash_id, f"#{atm_id}#")
+        for atm_id, _, matching_ids, _ in matches
+        for cash_id in matching_ids
+    ]
+
+
+def generate_update_queries(matches: List[Tuple[int, float, List[int], float]]) -> str:
+    """
+    Renders the matches as one batched UPDATE, preceded by a comment per ATM.
+    """
+    lines = []
+    for atm_id, atm_amount, matching_ids, total_sum in matches:
+        shortfall = atm_amount - total_sum
+        lines.append(
+            f"-- ATM #{atm_id}# (₹{atm_amount:.0f}) → ₹{total_sum:.0f} (shortfall: ₹{shortfall:.0f}): "
+            f"{', '.join(map(str, matching_ids))}"
+        )
+    values = ",\n       ".join(f"({cash_id}, '{tag}')" for cash_id, tag in update_values(matches))
+    lines.append(f"""UPDATE transactions AS t SET tags = COALESCE(t.tags, '') || v.tag
+FROM (VALUES {values}) AS v(id, tag)
+WHERE t.id = v.id;""")
+    return "\n".join(lines)
+
+
+def apply_updates(conn, matches: List[Tuple[int, float, List[int], float]]) -> int:
+    """
+    Tags the matched cash debits with one batched UPDATE ... FROM (VALUES ...)
+    and commits. Returns the number of rows updated.
+    """
+    query = """
+        UPDATE transactions AS t SET tags = COALESCE(t.tags, '') || v.tag
+        FROM (VALUES %s) AS v(id, tag)
+        WHERE t.id = v.id;
+    """
+    values = update_values(matches)
+    with conn.cursor() as cur:
+        execute_values(cur, query, values, page_size=max(len(values), 1))
+        updated = cur.rowcount
+    conn.commit()
+    return updated
 
 
 def parse_dates(date_str: str) -> str:
@@ -152,6 +460,46 @@ def main():
         default=100.0,
         help="Matching tolerance in Rs (default: 100)",
     )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Pick the subset of cash debits closest to each ATM amount instead of the greedy match",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=1.0,
+        help="Seconds the exact match may spend per ATM before falling back to greedy (default: 1)",
+    )
+    parser.add_argument(
+        "--max-candidates",
+        type=int,
+        default=1000,
+        help="Use greedy for ATMs with more cash debits than this in --exact mode (default: 1000)",
+    )
+    parser.add_argument(
+        "--global",
+        dest="global_assignment",
+        action="store_true",
+        help="Assign cash debits to all the ATMs together with a min cost flow instead of in date order",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=3,
+        help="In --global mode, a cash debit can go to this many most recent ATMs before it (default: 3)",
+    )
+    parser.add_argument(
+        "--solver-time-budget",
+        type=float,
+        default=30.0,
+        help="Seconds the --global flow solver may run (default: 30)",
+    )
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Also run the UPDATE against the database instead of only writing the SQL file",
+    )
 
     args = parser.parse_args()
 
@@ -172,58 +520,35 @@ def main():
         conn.close()
         return
 
-    update_queries = []
-    successful_matches = 0
-    skipped_already_tagged = 0
-    used_cash_ids = set()
-
-    for atm_id, atm_date, atm_amount in atm_withdrawals:
-        print(f"\n🔍 ATM #{atm_id} ({atm_date}): ₹{atm_amount:.0f}")
-
-        # NEW: Check existing tags first
-        already_sufficient, tagged_sum = check_existing_tags(
-            conn, atm_id, atm_amount, args.tolerance
+    # Everything the matcher needs, in three bulk queries
+    tagged_sums = fetch_existing_tag_sums(conn, [atm[0] for atm in atm_withdrawals])
+    cash_debits = fetch_cash_debits(conn, args.from_date, args.to_date)
+    print(f"📥 Found {len(cash_debits)} untagged cash debits")
+
+    matcher = find_matching_transactions
+    if args.exact:
+        matcher = partial(
+            find_exact_matching_transactions,
+            time_budget=args.time_budget,
+            max_candidates=args.max_candidates,
         )
-        if already_sufficient:
-            print(
-                f"   ⏭️  SKIPPED: Already tagged sum ₹{tagged_sum:.0f} within tolerance"
-            )
-            skipped_already_tagged += 1
-            continue
-
-        print(
-            f"   📊 Existing tagged sum: ₹{tagged_sum:.0f} (needs ₹{atm_amount-tagged_sum:.0f} more)"
+    if args.global_assignment:
+        matches, skipped_already_tagged, shortfalls = solve_global_assignment(
+            atm_withdrawals,
+            tagged_sums,
+            cash_debits,
+            args.tolerance,
+            window=args.window,
+            time_budget=args.solver_time_budget,
+            subset_time_budget=args.time_budget,
         )
-
-        # Fetch untagged cash debits
-        cash_debits = fetch_cash_debits(conn, atm_date, args.from_date, args.to_date)
-
-        # Prevent tagging the same cash transaction under multiple ATMs
-        if used_cash_ids:
-            cash_debits = [t for t in cash_debits if t[0] not in used_cash_ids]
-
-        print(
-            f"   📈 {len(cash_debits)} untagged cash debits available (after excluding already used)"
+        short = sum(1 for shortfall in shortfalls.values() if shortfall > args.tolerance)
+        print(f"\n📉 ATMs still short by more than ₹{args.tolerance:.0f}: {short}")
+    else:
+        matches, skipped_already_tagged = match_atm_withdrawals(
+            atm_withdrawals, tagged_sums, cash_debits, args.tolerance, matcher
         )
-
-        matching_ids = find_matching_transactions(
-            atm_amount - tagged_sum, cash_debits, args.tolerance
-        )
-
-        if matching_ids:
-            # Mark these cash txns as used so they aren't reused for another ATM
-            used_cash_ids.update(matching_ids)
-
-            matched_sum = sum([t[2] for t in cash_debits if t[0] in matching_ids])
-            total_sum = tagged_sum + matched_sum
-            query = generate_update_queries(atm_id, matching_ids, atm_amount, total_sum)
-            update_queries.append(query)
-            successful_matches += 1
-            print(
-                f"   ✅ Matched {len(matching_ids)} NEW txns (total: ₹{total_sum:.0f})"
-            )
-        else:
-            print(f"   ❌ No additional match found")
+    successful_matches = len(matches)
 
     # Save UPDATE queries
     with open(args.output, "w") as f:
@@ -231,15 +556,19 @@ def main():
         f.write(f"-- Date Range: {args.from_date} to {args.to_date}\n")
         f.write(f"-- Tolerance: ±₹{args.tolerance}\n")
         f.write(f"-- Generated: {datetime.now().isoformat()}\n\n")
-        for query in update_queries:
-            f.write(query + "\n")
+        if matches:
+            f.write(generate_update_queries(matches) + "\n")
 
     print(f"\n📊 SUMMARY:")
     print(f"   ✅ New matches: {successful_matches}")
     print(f"   ⏭️  Skipped (already sufficient): {skipped_already_tagged}")
     print(f"   📄 Total ATMs processed: {len(atm_withdrawals)}")
-    print(f"💾 Generated {len(update_queries)} UPDATE queries → {args.output}")
-    print("⚠️  REVIEW BEFORE EXECUTING!")
+    print(f"💾 Generated UPDATE for {len(update_values(matches))} cash txns → {args.output}")
+    if args.apply and matches:
+        updated = apply_updates(conn, matches)
+        print(f"🏷️  Tagged {updated} cash txns in the database")
+    elif not args.apply:
+        print("⚠️  REVIEW BEFORE EXECUTING! (or rerun with --apply)")
 
     conn.close()
 
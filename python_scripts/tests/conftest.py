@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The scripts import their modules relative to python_scripts, like when run from there
+PYTHON_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PYTHON_SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_SCRIPTS_DIR)
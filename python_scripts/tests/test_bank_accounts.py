@@ -0,0 +1,52 @@
+import csv
+
+import pytest
+
+from bank_accounts.equitas_bank_account import equitas_bank_account_adapter
+from bank_accounts.kotak_bank_account import kotak_bank_account_adapter
+
+
+@pytest.fixture(autouse=True)
+def no_category_cache(monkeypatch):
+    monkeypatch.setenv("CATEGORY_CACHE_FILE", "")
+
+
+def read_output(path):
+    with open(path, newline="") as fp:
+        return [(row["txn_date"], row["txn_type"], float(row["txn_amount"])) for row in csv.DictReader(fp)]
+
+
+def test_equitas_amounts_are_parsed_to_floats(tmp_path):
+    statement = tmp_path / "equitas.csv"
+    with open(statement, "w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(["Date", "Reference No. / Cheque No.", "Narration", "Withdrawal\nINR", "Deposit\nINR", "ClosingBalance\nINR"])
+        writer.writerow(["01-Oct-2024", "REF1", "UPI SWIGGY", "1,234.50", "", "10,000.00"])
+        writer.writerow(["02-Oct-2024", "REF2", "SALARY", "", "50,000.00", "60,000.00"])
+        writer.writerow(["03-Oct-2024", "REF3", "Opening balance", "", "", "n/a"])
+    output = str(tmp_path / "equitas_output.csv")
+
+    equitas_bank_account_adapter(str(statement), output)
+
+    assert read_output(output) == [
+        ("2024-10-01", "Debit", 1234.5),
+        ("2024-10-02", "Credit", -50000.0),
+    ]
+
+
+def test_kotak_amounts_are_parsed_to_floats(tmp_path):
+    statement = tmp_path / "kotak.csv"
+    lines = ["header"] * 13 + [
+        '1,01-10-2024 10:00:00,01-10-2024,UPI SWIGGY,ref1,"1,234.50",DR,"10,000.00",CR',
+        '2,02-10-2024 11:00:00,02-10-2024,SALARY,ref2,"50,000.00",CR,"60,000.00",CR',
+        "3,bad,,x,,abc,DR,0,CR",
+    ]
+    statement.write_text("\n".join(lines) + "\n")
+    output = str(tmp_path / "kotak_output.csv")
+
+    kotak_bank_account_adapter(str(statement), output)
+
+    assert read_output(output) == [
+        ("2024-10-01 10:00:00", "Debit", 1234.5),
+        ("2024-10-02 11:00:00", "Credit", -50000.0),
+    ]
@@ -0,0 +1,52 @@
+import sqlite3
+
+from common.category_cache import SOURCE_OF_TRUTH, CategoryCache
+
+
+def result_for(description, category="Food"):
+    return category, "", "note" + SOURCE_OF_TRUTH % description
+
+
+def test_lookups_and_buffered_writes_leave_no_transaction_open(tmp_path):
+    cache_file = str(tmp_path / "cache.sqlite3")
+    cache = CategoryCache(cache_file)
+    cache.put("rules", "SWIGGY ORDER", result_for("SWIGGY ORDER"))
+    cache.flush()
+    assert cache.get("rules", "swiggy order") == result_for("swiggy order")
+    cache.put("rules", "ZOMATO", result_for("ZOMATO"))
+    assert not cache._conn.in_transaction
+
+    # Another process can still write without waiting for this one to exit
+    other = sqlite3.connect(cache_file, timeout=0)
+    other.execute("DELETE FROM category_cache WHERE description = 'nothing'")
+    other.commit()
+    other.close()
+
+    assert cache.get("rules", "zomato") == result_for("zomato")
+    cache.close()
+    assert CategoryCache(cache_file).get("rules", "zomato") == result_for("zomato")
+
+
+def test_writes_are_committed_every_flush_every_writes(tmp_path):
+    cache_file = str(tmp_path / "cache.sqlite3")
+    cache = CategoryCache(cache_file, flush_every=2, flush_interval=3600)
+    cache.put("rules", "a", result_for("a"))
+    reader = sqlite3.connect(cache_file)
+    assert reader.execute("SELECT COUNT(*) FROM category_cache").fetchone() == (0,)
+    cache.put("rules", "b", result_for("b"))
+    assert reader.execute("SELECT COUNT(*) FROM category_cache").fetchone() == (2,)
+    reader.close()
+    cache.close()
+
+
+def test_flush_evicts_least_recently_used(tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for description in ("a", "b"):
+        cache.put("rules", description, result_for(description))
+        cache.flush()
+    cache.get("rules", "a")
+    cache.put("rules", "c", result_for("c"))
+    cache.flush()
+    assert cache.get("rules", "b") is None
+    assert cache.get("rules", "a") is not None
+    cache.close()
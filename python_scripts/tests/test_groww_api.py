@@ -0,0 +1,45 @@
+import json
+
+import pytest
+import requests
+
+from stocks.consolidated_view import groww_api, groww_cache
+
+
+def make_response(status_code, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode()
+    return response
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("GROWW_CACHE_FILE", str(tmp_path / "groww_cache.sqlite3"))
+    monkeypatch.setattr(groww_cache, "_groww_cache", None)
+    yield groww_cache.get_groww_cache()
+    groww_cache.get_groww_cache().close()
+
+
+def serve(monkeypatch, details_status):
+    def fake_get(url, headers):
+        if "/search/v3/" in url:
+            return make_response(200, {"data": {"content": []}})
+        if details_status is None:
+            raise requests.Timeout("timed out")
+        return make_response(details_status)
+
+    monkeypatch.setattr(groww_api, "_get", fake_get)
+
+
+@pytest.mark.parametrize("details_status", [None, 429, 503])
+def test_transient_errors_are_not_remembered_as_failed(monkeypatch, cache, details_status):
+    serve(monkeypatch, details_status)
+    assert groww_api.get_mf_details("Some Fund Direct Growth") is None
+    assert not cache.recently_failed("Some Fund Direct Growth")
+
+
+def test_funds_groww_does_not_know_are_remembered_as_failed(monkeypatch, cache):
+    serve(monkeypatch, 404)
+    assert groww_api.get_mf_details("Some Fund Direct Growth") is None
+    assert cache.recently_failed("Some Fund Direct Growth")
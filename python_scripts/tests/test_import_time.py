@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+PYTHON_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Generous enough for a slow CI machine, far below the seconds pandas and tabula take
+STARTUP_BUDGET_SECONDS = 2.0
+HEAVY_MODULES = ("pandas", "numpy", "tabula")
+
+RUN_HELP = """
+import json, runpy, sys
+sys.argv = ["personal_finance_converter.py", "--help"]
+try:
+    runpy.run_path("personal_finance_converter.py", run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps(sorted(name for name in %r if name in sys.modules)))
+""" % (HEAVY_MODULES,)
+
+
+def test_help_does_not_import_heavy_modules():
+    started = time.monotonic()
+    completed = subprocess.run(
+        [sys.executable, "-c", RUN_HELP],
+        cwd=PYTHON_SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.monotonic() - started
+
+    assert "usage:" in completed.stdout
+    assert json.loads(completed.stdout.splitlines()[-1]) == []
+    assert elapsed < STARTUP_BUDGET_SECONDS, f"--help took {elapsed:.2f}s"
@@ -0,0 +1,23 @@
+import datetime
+
+import pytest
+
+from common.parquet_utils import read_result, write_result_parquet
+
+pytest.importorskip("pyarrow")
+
+
+def test_unparseable_dates_and_amounts_are_written_as_null(tmp_path):
+    out_filename = str(tmp_path / "output.parquet")
+    rows = [
+        {"txn_date": "2024-01-02", "account": "HDFC Bank Account", "txn_amount": "10.5"},
+        {"txn_date": "02/01/2024", "account": "HDFC Bank Account", "txn_amount": "abc"},
+        {"txn_date": "nan", "account": "HDFC Bank Account", "txn_amount": float("nan")},
+    ]
+
+    write_result_parquet(out_filename, rows)
+
+    df = read_result(out_filename)
+    assert df["txn_date"].tolist()[0] == datetime.date(2024, 1, 2)
+    assert df["txn_date"].isna().tolist() == [False, True, True]
+    assert df["txn_amount"].isna().tolist() == [False, True, True]
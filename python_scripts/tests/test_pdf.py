@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("tabula")
+PyPDF2 = pytest.importorskip("PyPDF2")
+
+from common import pdf
+
+
+@pytest.fixture
+def unlocked_dir(monkeypatch, tmp_path):
+    directory = str(tmp_path / "unlocked")
+    monkeypatch.setattr(pdf, "UNLOCKED_PDF_DIR", directory)
+    return directory
+
+
+@pytest.fixture
+def statement(monkeypatch, tmp_path):
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.encrypt("secret")
+    path = str(tmp_path / "statement.pdf")
+    with open(path, "wb") as fp:
+        writer.write(fp)
+    monkeypatch.setenv("TEST_PDF_PASSWORD", "secret")
+    return path
+
+
+def test_unlocked_copy_is_private_and_reused(monkeypatch, unlocked_dir, statement):
+    unlocked_path = pdf.unlock_pdf(statement, "TEST_PDF_PASSWORD")
+
+    assert os.path.dirname(unlocked_path) == unlocked_dir
+    assert os.stat(unlocked_dir).st_mode & 0o777 == 0o700
+    assert os.stat(unlocked_path).st_mode & 0o777 == 0o600
+    assert not PyPDF2.PdfReader(unlocked_path).is_encrypted
+
+    # The password isn't needed to reuse the decrypted copy
+    monkeypatch.delenv("TEST_PDF_PASSWORD")
+    assert pdf.unlock_pdf(statement, "TEST_PDF_PASSWORD") == unlocked_path
+
+
+def test_shared_or_symlinked_directory_is_rejected(tmp_path, unlocked_dir, statement):
+    os.mkdir(unlocked_dir, 0o755)
+    os.chmod(unlocked_dir, 0o755)
+    with pytest.raises(PermissionError):
+        pdf.unlock_pdf(statement, "TEST_PDF_PASSWORD")
+
+    os.rmdir(unlocked_dir)
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    os.symlink(target, unlocked_dir)
+    with pytest.raises(PermissionError):
+        pdf.unlock_pdf(statement, "TEST_PDF_PASSWORD")
+
+
+def test_old_and_excess_copies_are_evicted(monkeypatch, unlocked_dir, statement):
+    monkeypatch.setattr(pdf, "UNLOCKED_PDF_MAX_FILES", 2)
+    os.mkdir(unlocked_dir, 0o700)
+    now = time.time()
+    for name, age in (("stale.pdf", pdf.UNLOCKED_PDF_MAX_AGE_SECONDS + 60), ("older.pdf", 20), ("newer.pdf", 10)):
+        path = os.path.join(unlocked_dir, name)
+        open(path, "wb").close()
+        os.utime(path, (now - age, now - age))
+
+    unlocked_path = pdf.unlock_pdf(statement, "TEST_PDF_PASSWORD")
+
+    assert sorted(os.listdir(unlocked_dir)) == sorted(["newer.pdf", "older.pdf", os.path.basename(unlocked_path)])
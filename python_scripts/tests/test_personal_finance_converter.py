@@ -0,0 +1,45 @@
+import pytest
+
+from personal_finance_converter import read_batch_jobs
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+    return str(path)
+
+
+def test_directory_jobs_are_chosen_by_adapter_extension(tmp_path):
+    hdfc_xls = touch(tmp_path / "HDFC_BANK_ACCOUNT" / "oct_2024.xls")
+    hdfc_pdf = touch(tmp_path / "HDFC_BANK_ACCOUNT" / "oct_2024.pdf")
+    card_pdf = touch(tmp_path / "hdfc_credit_card" / "oct_2024.pdf")
+    card_output = touch(tmp_path / "hdfc_credit_card" / "oct_2024_output.csv")
+    touch(tmp_path / "not_an_account" / "oct_2024.pdf")
+
+    jobs, skipped = read_batch_jobs(str(tmp_path))
+
+    assert jobs == [
+        ("HDFC_BANK_ACCOUNT", hdfc_xls, None),
+        ("HDFC_CREDIT_CARD", card_pdf, None),
+    ]
+    assert [(account_type, path) for account_type, path, _ in skipped] == [
+        ("HDFC_BANK_ACCOUNT", hdfc_pdf),
+        ("HDFC_CREDIT_CARD", card_output),
+    ]
+
+
+def test_directories_of_accounts_without_adapter_are_skipped(tmp_path):
+    paytm_statement = touch(tmp_path / "PAYTM_WALLET" / "oct_2024.csv")
+
+    jobs, skipped = read_batch_jobs(str(tmp_path))
+
+    assert jobs == []
+    assert skipped == [("PAYTM_WALLET", paytm_statement, "No adapter for this account type")]
+
+
+def test_manifest_rejects_accounts_without_adapter(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("type,path\nHDFC_CREDIT_CARD,oct.pdf\nPAYTM_WALLET,oct.csv\n")
+
+    with pytest.raises(ValueError, match="No adapter"):
+        read_batch_jobs(str(manifest))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from tag_cash_txns import find_closest_subset
+
+DAY = date(2024, 1, 1)
+
+
+def test_closest_subset_never_goes_over_the_real_limit():
+    # Both round to 500, but together they are 0.8 over 1000
+    assert find_closest_subset(1000, [(1, DAY, 500.4), (2, DAY, 500.4)], tolerance=0) == [1]
+    assert sorted(find_closest_subset(1000, [(1, DAY, 500.4), (2, DAY, 500.4), (3, DAY, 499.0)], tolerance=0)) == [1, 3]
+
+
+def test_closest_subset_finds_the_exact_sum():
+    cash = [(1, DAY, 300.0), (2, DAY, 700.0), (3, DAY, 450.0), (4, DAY, 550.0), (5, DAY, 200.0)]
+    ids = find_closest_subset(1500, cash, tolerance=0)
+    assert sum(amount for tid, _, amount in cash if tid in ids) == 1500
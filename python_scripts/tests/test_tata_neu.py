@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from rewards import tata_neu
+
+PAGE_SIZE = 2
+
+
+class StubLedger:
+    """
+    Serves a ledger newest first, PAGE_SIZE entries per page, like getCustomerLedgerInfo.
+    Offsets listed in fail_once answer 503 the first time they are requested.
+    """
+
+    def __init__(self, transaction_ids, fail_once=()):
+        self.transaction_ids = list(transaction_ids)
+        self.fail_once = set(fail_once)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                offset = int(parse_qs(urlparse(self.path).query)["offset"][0])
+                stub.requests.append(offset)
+                if offset in stub.fail_once:
+                    stub.fail_once.discard(offset)
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.page(offset)).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/ledger"
+
+    def page(self, offset):
+        ids = self.transaction_ids[offset * PAGE_SIZE:(offset + 1) * PAGE_SIZE]
+        return {
+            "ledgerDetails": {"pageCount": max(1, -(-len(self.transaction_ids) // PAGE_SIZE))},
+            "ledgerEntries": [
+                {
+                    "ledgerCreatedDate": "2024-01-01",
+                    "transactionDetails": {"transactionId": transaction_id},
+                    "entryDetails": [{"ledgerEntryType": "CREDIT", "points": 1}],
+                }
+                for transaction_id in ids
+            ],
+        }
+
+
+@pytest.fixture
+def database(monkeypatch, tmp_path):
+    """
+    Replaces the database with a dict keyed like the table's unique constraint.
+    """
+    rows = {}
+
+    def dump_to_database(entries, conn):
+        inserted = 0
+        for entry in entries:
+            key = (entry["transaction_id"], entry["transaction_type"])
+            if key not in rows:
+                rows[key] = entry
+                inserted += 1
+        return inserted
+
+    monkeypatch.setattr(tata_neu, "get_db_connection", lambda: type("Conn", (), {"close": lambda self: None})())
+    monkeypatch.setattr(tata_neu, "dump_to_database", dump_to_database)
+    monkeypatch.setattr(tata_neu, "CHECKPOINT_FILE", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(tata_neu, "_session", None)
+    monkeypatch.setattr(tata_neu.Retry, "DEFAULT_BACKOFF_MAX", 0)
+    for name, value in (
+        ("TATA_NEU_AUTHORIZATION_TOKEN", "token"),
+        ("TATA_NEU_CLIENT_ID", "client"),
+        ("TATA_NEU_CLIENT_SECRET", "secret"),
+    ):
+        monkeypatch.setenv(name, value)
+    return rows
+
+
+def use_ledger(monkeypatch, ledger):
+    monkeypatch.setattr(tata_neu, "LEDGER_URL", ledger.url)
+
+
+def saved_ids(database):
+    return sorted(transaction_id for transaction_id, _ in database)
+
+
+def test_fetches_every_page_concurrently_and_retries_5xx(monkeypatch, database):
+    ledger = StubLedger([f"t{i}" for i in range(9, -1, -1)], fail_once={2})
+    use_ledger(monkeypatch, ledger)
+
+    tata_neu.process(workers=3)
+
+    assert saved_ids(database) == sorted(f"t{i}" for i in range(10))
+    assert ledger.requests.count(2) == 2
+    assert tata_neu.load_checkpoint()[0] == 5
+
+
+def test_resync_catches_up_on_more_than_a_page_of_new_entries(monkeypatch, database):
+    ledger = StubLedger([f"t{i}" for i in range(9, -1, -1)])
+    use_ledger(monkeypatch, ledger)
+    tata_neu.process(workers=3)
+
+    # Five new entries shift the old ones by more than two pages
+    ledger.transaction_ids = [f"t{i}" for i in range(14, 9, -1)] + ledger.transaction_ids
+    ledger.requests.clear()
+    tata_neu.process(workers=3)
+
+    assert saved_ids(database) == sorted(f"t{i}" for i in range(15))
+    # Stops at the first fully saved page instead of reading the whole ledger
+    assert max(ledger.requests) < 5
+
+
+def test_interrupted_backfill_resumes_from_the_end(monkeypatch, database):
+    ledger = StubLedger([f"t{i}" for i in range(9, -1, -1)])
+    use_ledger(monkeypatch, ledger)
+    fetch_ledger_page = tata_neu.fetch_ledger_page
+
+    def failing_fetch(offset):
+        if offset == 2:
+            raise RuntimeError("connection lost")
+        return fetch_ledger_page(offset)
+
+    monkeypatch.setattr(tata_neu, "fetch_ledger_page", failing_fetch)
+    with pytest.raises(RuntimeError):
+        tata_neu.process(workers=1)
+    assert tata_neu.load_checkpoint()[0] == 2
+
+    monkeypatch.setattr(tata_neu, "fetch_ledger_page", fetch_ledger_page)
+    ledger.requests.clear()
+    tata_neu.process(workers=1)
+
+    assert saved_ids(database) == sorted(f"t{i}" for i in range(10))
+    assert tata_neu.load_checkpoint()[0] == 5
+    assert 4 not in ledger.requests
+
+
+def test_resumed_backfill_fetches_the_remaining_pages_concurrently(monkeypatch, database):
+    ledger = StubLedger([f"t{i}" for i in range(39, -1, -1)])
+    use_ledger(monkeypatch, ledger)
+    fetch_ledger_page = tata_neu.fetch_ledger_page
+
+    def failing_fetch(offset):
+        if offset == 15:
+            raise RuntimeError("connection lost")
+        return fetch_ledger_page(offset)
+
+    monkeypatch.setattr(tata_neu, "fetch_ledger_page", failing_fetch)
+    with pytest.raises(RuntimeError):
+        tata_neu.process(workers=1)
+    assert tata_neu.load_checkpoint() == (4, ("t39", "CREDIT"))
+
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = [0]
+    main_thread_offsets = []
+
+    def tracking_fetch(offset):
+        if threading.current_thread() is threading.main_thread():
+            main_thread_offsets.append(offset)
+        with lock:
+            in_flight.append(offset)
+            max_in_flight[0] = max(max_in_flight[0], len(in_flight))
+        try:
+            time.sleep(0.02)
+            return fetch_ledger_page(offset)
+        finally:
+            with lock:
+                in_flight.remove(offset)
+
+    monkeypatch.setattr(tata_neu, "fetch_ledger_page", tracking_fetch)
+    tata_neu.process(workers=4)
+
+    assert saved_ids(database) == sorted(f"t{i}" for i in range(40))
+    # Only the head page is read one at a time, the rest goes to the thread pool
+    assert main_thread_offsets == [0]
+    assert max_in_flight[0] > 1
+    assert tata_neu.load_checkpoint()[0] == 20
+
+
+def test_entries_without_transaction_details_get_a_stable_key():
+    page = {
+        "ledgerEntries": [
+            {
+                "ledgerCreatedDate": "2024-02-01",
+                "entryDetails": [{"ledgerEntryType": "DEBIT", "points": 5, "pointsCategory": "Expiry"}],
+            }
+        ]
+    }
+    first, second = tata_neu.extract_entries(page), tata_neu.extract_entries(page)
+    assert first[0]["transaction_id"] is not None
+    assert first[0]["transaction_id"] == second[0]["transaction_id"]
@@ -1,4 +1,5 @@
 # TODO : write usage and description
+import argparse
 import datetime
 import os
 import json
@@ -8,7 +9,7 @@ import pandas as pd
 import requests
 import logging
 from typing import List, Dict
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_values
 import psycopg2
 from dotenv import load_dotenv
 
@@ -21,6 +22,8 @@ logging.basicConfig(level=logging.INFO)
 # Constants
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:139.0) Gecko/20100101 Firefox/139.0"
 PICKLE_FILE = "zaggle.pickle"
+# Newest transaction saved by the last successful sync, used by the incremental mode
+SYNC_STATE_FILE = "zaggle_sync_state.json"
 ZAGGLE_AUTH_URL = "https://api.zaggle.in/api/v1/auth/basic"
 ZAGGLE_SET_TOKEN_URL = "https://app.zaggle.in/api/setToken"
 ZAGGLE_CARD_DETAILS_URL = "https://api.zaggle.in/api/v1/profile/user_balances"
@@ -28,6 +31,8 @@ ZAGGLE_TRANSACTIONS_URL = "https://api.zaggle.in/api/v1/narada/last_transactions
 DEVICE_ID = "f335108fe5ae"
 CLIENT_NAME = "WebBrowser"
 CLIENT_VERSION = "WebBrowser"
+# Rows per INSERT statement when saving to the database
+BATCH_SIZE = int(os.getenv("ZAGGLE_BATCH_SIZE", 500))
 
 
 def get_token() -> dict:
@@ -139,11 +144,28 @@ def fetch_card_details() -> str:
     data = response.json()
     return data["expense_cards"][0]["id"]
 
-def fetch_transactions() -> List[Dict]:
-    token_data = fetch_token_data()
-    ysc_card_id = fetch_card_details()
+def load_sync_state():
+    """
+    Returns the {"id", "txn_date"} of the newest transaction saved by the last sync,
+    or None when nothing was synced yet.
+    """
+    if not os.path.exists(SYNC_STATE_FILE):
+        return None
+    with open(SYNC_STATE_FILE, "r") as f:
+        return json.load(f)
 
-    headers = {
+
+def save_sync_state(transactions: List[Dict]):
+    if not transactions:
+        return
+    newest = max(transactions, key=lambda t: t["txn_date"])
+    with open(SYNC_STATE_FILE, "w") as f:
+        json.dump({"id": newest["id"], "txn_date": newest["txn_date"]}, f)
+    logger.info(f"Saved sync state: {newest['id']} at {newest['txn_date']}")
+
+
+def transactions_headers(token_data: dict) -> dict:
+    return {
         "User-Agent": USER_AGENT,
         "Accept": "application/json",
         "Accept-Language": "en-US,en;q=0.5",
@@ -155,6 +177,20 @@ def fetch_transactions() -> List[Dict]:
         "Authorization": f"Token token={token_data['token']};client_key=client_key;device_id={token_data['device_id']};client_id={token_data['client_id']}"
     }
 
+
+def fetch_transactions(since: Dict = None) -> List[Dict]:
+    """
+    Pages through the card transactions, newest first.
+
+    When since (see load_sync_state) is given, paging stops at the first page that
+    reaches a transaction older than or equal to it, and only the newer transactions
+    are returned. An expired token is refreshed and the current page is retried.
+    """
+    token_data = fetch_token_data()
+    ysc_card_id = fetch_card_details()
+
+    headers = transactions_headers(token_data)
+
     all_transactions = []
     page_no = 1
     count = 25
@@ -169,9 +205,9 @@ def fetch_transactions() -> List[Dict]:
         response = requests.post(ZAGGLE_TRANSACTIONS_URL, headers=headers, data=data)
 
         if response.status_code == 401:
-            logger.warning("Token expired during fetch_transactions. Re-authenticating...")
-            get_token()
-            return fetch_transactions()
+            logger.warning(f"Token expired during fetch_transactions. Re-authenticating and retrying page {page_no}...")
+            headers = transactions_headers(get_token())
+            continue
 
         response.raise_for_status()
         resp_data = response.json()
@@ -180,8 +216,9 @@ def fetch_transactions() -> List[Dict]:
         if not transactions:
             break
 
+        reached_known = False
         for t in transactions:
-            all_transactions.append({
+            txn = {
                 "merchant_name": t.get("MerchantName", ""),
                 "txn_status": t.get("TransStatus", ""),
                 "txn_type": t.get("Description", ""),
@@ -190,14 +227,22 @@ def fetch_transactions() -> List[Dict]:
                 "id": t["id"],
                 "closing_balance": t["ClosingBalance"],
                 "response_reason": t.get("ResponseReason", "")
-            })
+            }
+            if since and (txn["id"] == since["id"] or txn["txn_date"] < since["txn_date"]):
+                reached_known = True
+                continue
+            all_transactions.append(txn)
+
+        if reached_known:
+            logger.info(f"Reached transactions synced earlier on page {page_no}, stopping.")
+            break
 
         page_no += 1
 
     return all_transactions
 
 
-def dump_to_database(entries: List[Dict]):
+def get_db_connection():
     load_dotenv()
 
     DB_USER = os.getenv("DB_USER")
@@ -209,63 +254,60 @@ def dump_to_database(entries: List[Dict]):
     if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
         raise EnvironmentError("Database environment variables are not properly set.")
 
+    return psycopg2.connect(
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME
+    )
+
+
+def dump_to_database(entries: List[Dict], conn, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Inserts the entries over the given connection, batch_size rows per statement,
+    and commits once. Entries whose id is already in the table are skipped.
+
+    Returns the number of rows inserted.
+    """
     table_name = "zaggle_transactions"
 
     insert_query = f"""
         INSERT INTO {table_name} (
             id, merchant_name, txn_date, txn_type, txn_status, txn_amount, closing_balance, response_reason
-        ) VALUES (
-            %(id)s, %(merchant_name)s, %(txn_date)s, %(txn_type)s, %(txn_status)s, %(txn_amount)s, %(closing_balance)s, %(response_reason)s
-        );
+        ) VALUES %s
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id;
     """
-
-    conn = psycopg2.connect(
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME
+    template = (
+        "(%(id)s, %(merchant_name)s, %(txn_date)s, %(txn_type)s, %(txn_status)s, %(txn_amount)s, "
+        "%(closing_balance)s, %(response_reason)s)"
     )
-    cursor = conn.cursor()
 
+    cursor = conn.cursor()
     try:
-        logger.info(f"Inserting {len(entries)} records into '{table_name}'...")
-        sample_sql = cursor.mogrify(insert_query, entries[0])
-        logger.info(f"Sample SQL:\n{sample_sql.decode()}")
-        execute_batch(cursor, insert_query, entries)
+        logger.info(f"Inserting {len(entries)} records into '{table_name}' in batches of {batch_size}...")
+        inserted = execute_values(cursor, insert_query, entries, template=template, page_size=batch_size, fetch=True)
         conn.commit()
-        logger.info("Data successfully inserted into the database.")
+        logger.info(f"Inserted {len(inserted)} records, skipped {len(entries) - len(inserted)} already present.")
+        return len(inserted)
     except Exception as e:
-        if conn:
-            conn.rollback()
+        conn.rollback()
         logger.error(f"Database insert error: {e}")
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info("Database connection closed.")
 
 
-def dump_to_database_batch(entries: List[Dict]):
+def dump_to_database_batch(entries: List[Dict], batch_size: int = BATCH_SIZE) -> int:
     if not entries:
-        return
-    batch_size = 1
-    logger.info(f"Processing {len(entries)} entries in batches of {batch_size}...")
-
-    for i in range(0, len(entries), batch_size):
-        batch = entries[i:i + batch_size]
-        logger.info(f"Processing batch {i // batch_size + 1} with {len(batch)} entries...")
-        try:
-            dump_to_database(batch)
-        except psycopg2.errors.UniqueViolation as ve:
-            logger.error(f"Unique constraint violated: {ve}")
-            raise ve
-        except psycopg2.errors.IntegrityError as ie:
-            logger.error(f"Integrity error: {ie}")
-            raise ie
-        except Exception as e:
-            logger.error(f"Unexpected error in batch: {e}")
-            raise e
+        return 0
+    conn = get_db_connection()
+    try:
+        return dump_to_database(entries, conn, batch_size)
+    finally:
+        conn.close()
+        logger.info("Database connection closed.")
 
 
 def transform(transactions):
@@ -302,13 +344,19 @@ def transform(transactions):
     write_result(output_file, result)
 
 
-def process():
+def process(full: bool = False):
     """
-    Fetch Zaggle transactions and insert them into the database in batch size 1.
+    Fetch Zaggle transactions and insert them into the database in batches of BATCH_SIZE.
+
+    Only the transactions newer than the last successful sync are fetched unless
+    full is set.
     """
     transactions = []
+    since = None if full else load_sync_state()
+    if since:
+        logger.info(f"Fetching transactions newer than {since['id']} at {since['txn_date']}")
     try:
-        transactions = fetch_transactions()
+        transactions = fetch_transactions(since)
         logger.info(f"Fetched {len(transactions)} transactions.")
     except Exception as exc:
         logger.exception(f"Exception in fetching transactions {exc}")
@@ -316,6 +364,7 @@ def process():
     #     logout()
     try:
         dump_to_database_batch(transactions)
+        save_sync_state(transactions)
     except Exception as e:
         logger.exception(f"Exception in saving to database: {e}")
     try:
@@ -326,4 +375,7 @@ def process():
 
 
 if __name__ == "__main__":
-    process()
+    parser = argparse.ArgumentParser(description="Sync Zaggle food card transactions to the database")
+    parser.add_argument("--full", action="store_true", help="Fetch the whole history instead of only new transactions")
+    args = parser.parse_args()
+    process(args.full)
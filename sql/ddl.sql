@@ -458,6 +458,29 @@ CREATE INDEX transactions_notes_idx ON public.transactions USING btree (notes);
 CREATE INDEX transactions_tags_idx ON public.transactions USING btree (tags);
 CREATE INDEX transactions_txn_amount_idx ON public.transactions USING btree (txn_amount);
 CREATE INDEX transactions_txn_date_idx ON public.transactions USING btree (txn_date);
+
+
+-- public.tata_neu_transactions definition
+
+-- Drop table
+
+-- DROP TABLE public.tata_neu_transactions;
+
+CREATE TABLE public.tata_neu_transactions (
+	transaction_type varchar(20) NULL,
+	created_at timestamp NULL,
+	points float8 NULL,
+	points_category varchar(100) NULL,
+	program_name varchar(100) NULL,
+	transaction_id varchar(256) NOT NULL,
+	transaction_number varchar(100) NULL,
+	txn_amount float8 NULL,
+	txn_gross_amount float8 NULL,
+	txn_date timestamp NULL,
+	store varchar(256) NULL,
+	CONSTRAINT tata_neu_transactions_unique UNIQUE (transaction_id, transaction_type)
+);
+CREATE INDEX tata_neu_transactions_created_at_idx ON public.tata_neu_transactions USING btree (created_at);
 CREATE INDEX transactions_txn_type_idx ON public.transactions USING btree (txn_type);
 
 -- Table Triggers
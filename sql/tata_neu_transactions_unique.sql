@@ -0,0 +1,22 @@
+-- Adds the unique constraint rewards/tata_neu.py relies on (ON CONFLICT) to an
+-- existing public.tata_neu_transactions table.
+
+BEGIN;
+
+-- Earlier syncs inserted every page blindly, keep one copy of each entry
+DELETE FROM public.tata_neu_transactions a
+USING public.tata_neu_transactions b
+WHERE a.transaction_id = b.transaction_id
+  AND a.transaction_type = b.transaction_type
+  AND a.ctid > b.ctid;
+
+-- Entries without bill details were saved with a NULL transaction_id, the sync now
+-- gives them a stable key. Drop them and run `python rewards/tata_neu.py --full`
+-- afterwards to fetch them again with that key.
+DELETE FROM public.tata_neu_transactions WHERE transaction_id IS NULL;
+
+ALTER TABLE public.tata_neu_transactions ALTER COLUMN transaction_id SET NOT NULL;
+ALTER TABLE public.tata_neu_transactions
+    ADD CONSTRAINT tata_neu_transactions_unique UNIQUE (transaction_id, transaction_type);
+
+COMMIT;